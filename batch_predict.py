@@ -0,0 +1,180 @@
+"""
+Score a CSV or JSONL file of input records in bulk and stream the predictions to a file.
+
+    python batch_predict.py survey.csv predictions.csv
+    python batch_predict.py records.jsonl predictions.jsonl --chunksize 200000 --workers 4
+
+The input is read in chunks of ``--chunksize`` records. Every chunk is encoded in
+vectorized passes against the resident model (see ``frame_to_codes``), scored with a
+single call and serialized with a ``prediction`` column (1 for poisonous), then appended
+to the output.
+CSV columns may be named like the API fields or like the raw dataset, whose values
+outside the API domain are scored as 'o' (others). With ``--workers`` above 1 the chunks
+are scored and serialized in that many processes, each loading the model once, and
+written in order.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.MushroomClassification import logger
+from src.MushroomClassification.pipeline.prediction import (Prediction,
+                                                            get_model_registry)
+from src.MushroomClassification.utils.input_encoding import frame_to_codes
+
+# load the env variables for the mlflow tracking
+load_dotenv()
+
+FORMATS = ("csv", "jsonl")
+
+
+def file_format(path, fmt=None):
+    """Format given explicitly or by the file extension."""
+    fmt = fmt or Path(path).suffix.lstrip(".").lower()
+    if fmt == "json":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r} of {path}, expected {FORMATS}")
+    return fmt
+
+
+def read_chunks(path, fmt, chunksize):
+    """Stream the input records in DataFrames of ``chunksize`` rows, every value as a string."""
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=str)
+    else:
+        with pd.read_json(path, lines=True, chunksize=chunksize, dtype=False) as reader:
+            for chunk in reader:
+                yield chunk.astype(str)
+
+
+def score_chunk(chunk, fmt, header=False):
+    """
+    Predict every record of the chunk and serialize the records with their prediction.
+
+    :param chunk: DataFrame of input records
+    :param fmt: output format, "csv" or "jsonl"
+    :param header: whether to start a CSV with the column names
+    :return: (number of records, serialized text)
+    """
+    chunk = chunk.assign(prediction=Prediction(frame_to_codes(chunk)).classify_many())
+    if fmt == "csv":
+        text = chunk.to_csv(header=header, index=False)
+    else:
+        text = chunk.to_json(orient="records", lines=True)
+        text = text if text.endswith("\n") else text + "\n"
+    return len(chunk), text
+
+
+def _init_worker():
+    # load the model once per worker process instead of with its first chunk
+    get_model_registry().load()
+
+
+def score_chunks(chunks, fmt, workers):
+    """
+    Score and serialize the chunks in order, in this process or in ``workers`` processes.
+
+    At most two chunks per worker are in flight, so memory stays bounded by the chunk
+    size whatever the size of the input.
+
+    :return: generator of (number of records, serialized text)
+    """
+    if workers <= 1:
+        for i, chunk in enumerate(chunks):
+            yield score_chunk(chunk, fmt, header=i == 0)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = []
+        for i, chunk in enumerate(chunks):
+            pending.append(pool.submit(score_chunk, chunk, fmt, i == 0))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+class ChunkWriter:
+    def __init__(self, path):
+        """
+        Appends serialized chunks to a file, written to a temporary file and moved into
+        place once complete.
+
+        :param path: output file
+        """
+        self.path = Path(path)
+        self.partial_path = self.path.with_name(self.path.name + ".part")
+        self.rows = 0
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.partial_path, "w", newline="")
+        return self
+
+    def write(self, rows, text):
+        self.file.write(text)
+        self.rows += rows
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+        if exc_type is None:
+            os.replace(self.partial_path, self.path)
+        else:
+            os.remove(self.partial_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="CSV or JSONL file of input records")
+    parser.add_argument(
+        "output", help="CSV or JSONL file the predictions are written to"
+    )
+    parser.add_argument("--input-format", choices=FORMATS, help="default: by extension")
+    parser.add_argument(
+        "--output-format", choices=FORMATS, help="default: by extension"
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=100_000, help="records scored at a time"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes scoring chunks, 0 for all cores",
+    )
+    args = parser.parse_args()
+
+    input_format = file_format(args.input, args.input_format)
+    output_format = file_format(args.output, args.output_format)
+    workers = args.workers or os.cpu_count()
+    if workers <= 1:
+        get_model_registry().load()
+
+    start = time.perf_counter()
+    chunks = read_chunks(args.input, input_format, args.chunksize)
+    try:
+        with ChunkWriter(args.output) as writer:
+            for rows, text in score_chunks(chunks, output_format, workers):
+                writer.write(rows, text)
+                logger.info(f"Scored {writer.rows} records")
+    except Exception as e:
+        logger.exception(f"Error scoring {args.input}: {e}")
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Scored {writer.rows} records of {args.input} into {args.output} in "
+        f"{elapsed:.2f}s with {workers} worker(s): {writer.rows / elapsed:,.0f} rows/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare the latency of the compiled decision tree with ``model.predict``.
+
+Run from the repository root after training:
+
+    python benchmarks/bench_compiled_tree.py --rows 2000 --repeat 5
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# make the repository root importable when run as ``python benchmarks/<script>.py``
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.MushroomClassification.config.configuration import \
+    ConfigurationManager
+from src.MushroomClassification.pipeline.prediction import \
+    CompiledTreePredictor
+from src.MushroomClassification.utils.common import load_bin
+from src.MushroomClassification.utils.input_encoding import (InputEncoder,
+                                                             domain_codes)
+
+
+def best_of(repeat, fn):
+    """Best wall time of ``repeat`` calls of ``fn`` in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000, help="rows per batch")
+    parser.add_argument("--single", type=int, default=500, help="single-row calls")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions, best kept")
+    args = parser.parse_args()
+
+    config = ConfigurationManager().get_model_training_config()
+    model = load_bin(Path(config.model))
+    predictor = CompiledTreePredictor.load(config.compiled_model)
+    feature_names = list(model.feature_names_in_)
+
+    # sample inputs from the whole prediction domain
+    rng = np.random.default_rng(42)
+    codes = domain_codes()
+    codes = codes[rng.integers(0, len(codes), size=args.rows)]
+    X = InputEncoder(feature_names).encode_codes(codes)
+    df = pd.DataFrame(X, columns=feature_names)
+    rows = X.tolist()[: args.single]
+    row_frames = [df.iloc[[i]] for i in range(len(rows))]
+
+    assert (predictor.predict(X) == model.predict(df)).all(), "predictions differ"
+
+    results = {
+        "per-row model.predict": best_of(
+            args.repeat, lambda: [model.predict(row) for row in row_frames]
+        )
+        / len(rows),
+        "per-row compiled": best_of(
+            args.repeat, lambda: [predictor.predict_one(row) for row in rows]
+        )
+        / len(rows),
+        "per-batch model.predict": best_of(args.repeat, lambda: model.predict(df)),
+        "per-batch compiled": best_of(args.repeat, lambda: predictor.predict(X)),
+    }
+
+    print(f"tree: {len(predictor.tree)} nodes, depth {predictor.depth}")
+    print(f"batch: {args.rows} rows, single-row calls: {len(rows)}")
+    for name, seconds in results.items():
+        print(f"{name:<26} {seconds * 1e6:12.2f} us")
+
+
+if __name__ == "__main__":
+    main()
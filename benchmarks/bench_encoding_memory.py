@@ -0,0 +1,96 @@
+"""
+Compare the peak memory of the dense, uint8 and sparse one-hot encoding modes.
+
+Every mode runs in a fresh subprocess on the mushroom data replicated ``--scale``
+times, through ``preprocess`` and ``select_features``. Run from the repository root:
+
+    python benchmarks/bench_encoding_memory.py --scale 50
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# make the repository root importable when run as ``python benchmarks/<script>.py``
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.MushroomClassification.components.data_transformation import \
+    FeatureEngineeringConcreteStrategy
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB (ru_maxrss is in KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, data_path, scale):
+    df = pd.read_csv(data_path)
+    df = pd.concat([df] * scale, ignore_index=True)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    strategy = FeatureEngineeringConcreteStrategy(encoding=mode)
+    X, y = df.drop(columns=["class"]), df["class"]
+    preprocessed = strategy.preprocess(X, y)
+    selected = strategy.select_features(preprocessed, preprocessed["class"], k=19)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "rows": len(df),
+        "encoded_columns": preprocessed.shape[1] - 1,
+        "encoded_mb": preprocessed.memory_usage(deep=True).sum() / 2**20,
+        "baseline_peak_rss_mb": baseline,
+        "peak_rss_mb": peak_rss_mb(),
+        "seconds": elapsed,
+        "selected": list(selected.columns[:-1]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="notebook/mushrooms.csv")
+    parser.add_argument(
+        "--scale", type=int, default=50, help="times the data is replicated"
+    )
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.data, args.scale)))
+        return
+
+    results = []
+    for mode in FeatureEngineeringConcreteStrategy.ENCODINGS:
+        output = subprocess.run(
+            [sys.executable, *sys.argv, "--mode", mode],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    assert all(
+        r["selected"] == results[0]["selected"] for r in results
+    ), "selection differs"
+    print(
+        f"rows: {results[0]['rows']}, encoded columns: {results[0]['encoded_columns']}"
+    )
+    print(
+        f"{'mode':<8} {'encoded MiB':>12} {'peak RSS MiB':>13} {'+ over data':>12} {'seconds':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['mode']:<8} {r['encoded_mb']:12.1f} {r['peak_rss_mb']:13.1f} "
+            f"{r['peak_rss_mb'] - r['baseline_peak_rss_mb']:12.1f} {r['seconds']:8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compare FeatureScorer with sklearn's f_classif, chi2 and mutual_info_classif.
+
+The mushroom data replicated ``--scale`` times is one-hot encoded as uint8, and every
+score is computed by sklearn on the float64 matrix it converts to, and by FeatureScorer
+on the dense uint8, sparse and bit-packed matrices. Run from the repository root:
+
+    python benchmarks/bench_feature_scoring.py --scale 50
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_selection import chi2, f_classif, mutual_info_classif
+from sklearn.preprocessing import OneHotEncoder
+
+# make the repository root importable when run as ``python benchmarks/<script>.py``
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.MushroomClassification.utils.feature_scoring import (FeatureScorer,
+                                                              pack_features)
+
+SKLEARN_SCORES = {
+    "f_classif": f_classif,
+    "chi2": chi2,
+    "mutual_info": lambda X, y: mutual_info_classif(X, y, discrete_features=True),
+}
+
+
+def best_time(func, repeat):
+    """Best wall time of ``repeat`` calls and the result of the last one."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def scores_of(result):
+    return result[0] if isinstance(result, tuple) else result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="notebook/mushrooms.csv")
+    parser.add_argument(
+        "--scale", type=int, default=50, help="times the data is replicated"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs, best kept")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    df = pd.concat([df] * args.scale, ignore_index=True)
+    y = df.pop("class").map({"e": 0, "p": 1}).to_numpy()
+    X = OneHotEncoder(sparse_output=False, dtype=np.uint8).fit_transform(df)
+    inputs = {
+        "uint8": X,
+        "sparse": sp.csr_matrix(X),
+        "packed": pack_features(X),
+    }
+    print(f"{X.shape[0]} rows, {X.shape[1]} one-hot features")
+    print(
+        f"  memory: float64 {X.shape[0] * X.shape[1] * 8 / 2**20:.1f} MiB, uint8 "
+        f"{X.nbytes / 2**20:.1f} MiB, packed {inputs['packed'].bits.nbytes / 2**20:.1f} MiB\n"
+    )
+
+    for score, sklearn_func in SKLEARN_SCORES.items():
+        with np.errstate(all="ignore"):
+            reference_time, reference = best_time(
+                lambda: sklearn_func(X.astype(np.float64), y), args.repeat
+            )
+        print(f"{score}")
+        print(f"  {'sklearn (float64)':<20} {reference_time * 1e3:9.1f} ms")
+
+        scorer = FeatureScorer(score)
+        for name, features in inputs.items():
+            elapsed, result = best_time(lambda: scorer(features, y), args.repeat)
+            # perfectly separating features are inf here and huge finite numbers in sklearn
+            finite = np.isfinite(scores_of(reference)) & np.isfinite(scores_of(result))
+            same = np.allclose(scores_of(result)[finite], scores_of(reference)[finite])
+            print(
+                f"  {'FeatureScorer ' + name:<20} {elapsed * 1e3:9.1f} ms"
+                f"  {reference_time / elapsed:6.1f}x  scores match: {same}"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
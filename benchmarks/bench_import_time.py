@@ -0,0 +1,117 @@
+"""
+Measure the cold start of the serving entry points with ``python -X importtime``.
+
+Run from the repository root:
+
+    python benchmarks/bench_import_time.py --repeat 5 --top 15
+    python benchmarks/bench_import_time.py fastapiApp --startup
+
+Every measurement imports the module in a fresh interpreter. The report shows the best
+wall time, the cumulative import time of the module, the slowest top-level packages and
+whether heavy optional dependencies were imported at all. With ``--startup`` the time to
+load the model registry, as the FastAPI lifespan does, is measured as well.
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+# dependencies the serving path should only import when actually used
+HEAVY_MODULES = ("mlflow", "sklearn", "pandas", "joblib", "zenml", "pyarrow")
+
+STARTUP_CODE = (
+    "from src.MushroomClassification.pipeline.prediction import get_model_registry;"
+    "get_model_registry().load()"
+)
+
+
+def run(code, importtime=True):
+    """Run ``code`` in a fresh interpreter, return the wall time and the stderr lines."""
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", code]
+
+    start = time.perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        errors = [
+            line
+            for line in process.stderr.splitlines()
+            if not line.startswith("import time:")
+        ]
+        raise RuntimeError(f"{code!r} failed: {errors[-1] if errors else ''}")
+    return elapsed, process.stderr.splitlines()
+
+
+def parse_importtime(lines):
+    """
+    Parse ``-X importtime`` output.
+
+    :return: dict mapping every imported module to its (self, cumulative) time in microseconds
+    """
+    modules = {}
+    for line in lines:
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def by_package(modules):
+    """Sum the self time of every module into its top-level package."""
+    packages = defaultdict(int)
+    for name, (self_us, _) in modules.items():
+        packages[name.split(".")[0]] += self_us
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        default=["fastapiApp", "streamlitApp"],
+        help="modules to import",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs, best kept")
+    parser.add_argument("--top", type=int, default=10, help="packages listed")
+    parser.add_argument(
+        "--startup", action="store_true", help="also time loading the model registry"
+    )
+    args = parser.parse_args()
+
+    for target in args.targets:
+        try:
+            runs = [run(f"import {target}") for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{target}: {e}\n")
+            continue
+
+        wall, lines = min(runs, key=lambda r: r[0])
+        modules = parse_importtime(lines)
+        heavy = [m for m in HEAVY_MODULES if m in modules]
+
+        print(f"{target}")
+        print(f"  wall time (best of {args.repeat}) {wall * 1e3:10.1f} ms")
+        print(f"  import {target:<22} {modules[target][1] / 1e3:10.1f} ms")
+        print(f"  modules imported {len(modules):18d}")
+        print(f"  heavy dependencies imported {', '.join(heavy) or 'none'}")
+        print(f"  slowest packages (self time):")
+        for package, self_us in by_package(modules)[: args.top]:
+            print(f"    {package:<30} {self_us / 1e3:8.1f} ms")
+
+        if args.startup:
+            startup = min(
+                run(STARTUP_CODE, importtime=False)[0] for _ in range(args.repeat)
+            )
+            print(f"  registry load, imports included {startup * 1e3:7.1f} ms")
+        print()
+
+
+if __name__ == "__main__":
+    main()
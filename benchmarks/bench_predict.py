@@ -0,0 +1,281 @@
+"""
+Load-test the /predict routes of the FastAPI app and report throughput and latency.
+
+Payloads are realistic ``Input`` records, either the rows of the mushroom data mapped to
+the values the API accepts or random points of the whole input domain. The app is driven
+in-process through its ASGI interface, over a local uvicorn server, or both, with a fixed
+number of concurrent clients. Run from the repository root once a model is trained:
+
+    python benchmarks/bench_predict.py --requests 2000 --concurrency 1 16 64
+    python benchmarks/bench_predict.py --target server --endpoint batch --batch-size 100
+
+Besides the client-side latency, the p50/p95/p99 of every phase the server reports in
+its Server-Timing header (queue, model-load, transform and predict) are listed, so a
+regression in ``Prediction`` shows up in the phase it belongs to. ``--json`` saves the
+results to compare runs. Needs httpx.
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pandas as pd
+
+# make the repository root importable when run as ``python benchmarks/<script>.py``
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.MushroomClassification.constants import INPUT_DOMAIN
+from src.MushroomClassification.utils.input_encoding import domain_codes
+
+PERCENTILES = (50, 95, 99)
+
+
+def csv_payloads(path):
+    """Rows of the raw data as Input records, values outside the domain becoming 'o'."""
+    df = pd.read_csv(path)
+    columns = {
+        field: df[field.replace("_", "-")].where(
+            df[field.replace("_", "-")].isin(values), "o"
+        )
+        for field, values in INPUT_DOMAIN.items()
+    }
+    return pd.DataFrame(columns).to_dict("records")
+
+
+def domain_payloads(n, seed=42):
+    """Random Input records drawn uniformly from the whole input domain."""
+    codes = domain_codes()
+    codes = codes[np.random.default_rng(seed).integers(0, len(codes), size=n)]
+    values = [np.array(values) for values in INPUT_DOMAIN.values()]
+    return [
+        {field: str(values[f][row[f]]) for f, field in enumerate(INPUT_DOMAIN)}
+        for row in codes
+    ]
+
+
+def parse_server_timing(header):
+    """Phase durations in milliseconds from a Server-Timing header value."""
+    phases = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, _, params = entry.partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                phases[name] = float(value)
+    return phases
+
+
+def make_requests(payloads, endpoint, batch_size, n):
+    """(path, body) of ``n`` requests cycling through the payloads."""
+    if endpoint == "predict":
+        return [("/predict", payloads[i % len(payloads)]) for i in range(n)]
+    return [
+        (
+            "/predict/batch",
+            {
+                "inputs": [
+                    payloads[(i * batch_size + j) % len(payloads)]
+                    for j in range(batch_size)
+                ]
+            },
+        )
+        for i in range(n)
+    ]
+
+
+async def drive(client, requests, concurrency):
+    """
+    Send the requests with ``concurrency`` clients, each sending its next request as soon
+    as the previous one is answered.
+
+    :return: wall time, client latencies in ms, phase timings in ms and error count
+    """
+    pending = iter(requests)
+    latencies, phases, errors = [], defaultdict(list), 0
+
+    async def client_loop():
+        nonlocal errors
+        for path, body in pending:
+            start = time.perf_counter()
+            response = await client.post(path, json=body)
+            latencies.append((time.perf_counter() - start) * 1e3)
+            if response.status_code != 200 or "error" in response.json():
+                errors += 1
+                continue
+            timing = parse_server_timing(response.headers.get("server-timing", ""))
+            for phase, duration in timing.items():
+                phases[phase].append(duration)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, phases, errors
+
+
+def summarize(wall, latencies, phases, errors, rows_per_request):
+    def percentiles(values):
+        return {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_s": len(latencies) / wall,
+        "rows_per_s": len(latencies) * rows_per_request / wall,
+        "latency_ms": percentiles(latencies),
+        "phases_ms": {phase: percentiles(values) for phase, values in phases.items()},
+    }
+
+
+def report(target, concurrency, summary):
+    print(
+        f"{target:<10} concurrency {concurrency:<4} "
+        f"{summary['requests_per_s']:9.1f} req/s {summary['rows_per_s']:10.1f} rows/s"
+        f"  errors {summary['errors']}"
+    )
+    rows = [("latency", summary["latency_ms"])] + list(summary["phases_ms"].items())
+    for name, values in rows:
+        print(
+            f"  {name:<12}"
+            + "".join(f" {key} {value:9.3f} ms" for key, value in values.items())
+        )
+
+
+async def run_inprocess(args, requests, rows_per_request):
+    from fastapiApp import app
+
+    results = {}
+    # ASGITransport does not run the lifespan, which loads the model and starts the batcher
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            await drive(client, requests[: args.warmup], 1)
+            for concurrency in args.concurrency:
+                summary = summarize(
+                    *await drive(client, requests, concurrency), rows_per_request
+                )
+                report("in-process", concurrency, summary)
+                results[concurrency] = summary
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, timeout=60):
+    """Start uvicorn serving the app in a subprocess and wait until it answers."""
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "fastapiApp:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ]
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited before serving the app")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/model", timeout=1).raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"uvicorn did not answer within {timeout}s")
+
+
+async def run_server(args, requests, rows_per_request):
+    port = args.port or free_port()
+    server = start_server(port)
+    results = {}
+    try:
+        limits = httpx.Limits(max_connections=max(args.concurrency))
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits
+        ) as client:
+            await drive(client, requests[: args.warmup], 1)
+            for concurrency in args.concurrency:
+                summary = summarize(
+                    *await drive(client, requests, concurrency), rows_per_request
+                )
+                report("server", concurrency, summary)
+                results[concurrency] = summary
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--target", choices=["inprocess", "server", "both"], default="both"
+    )
+    parser.add_argument("--endpoint", choices=["predict", "batch"], default="predict")
+    parser.add_argument(
+        "--payloads",
+        choices=["csv", "domain"],
+        default="csv",
+        help="rows of the data or random points of the input domain",
+    )
+    parser.add_argument("--data", default="notebook/mushrooms.csv")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per run")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 16, 64],
+        help="concurrent clients, one run each",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=100, help="records per /predict/batch call"
+    )
+    parser.add_argument("--warmup", type=int, default=50, help="requests not measured")
+    parser.add_argument("--port", type=int, help="server port, a free one by default")
+    parser.add_argument("--json", help="save the results to this file")
+    args = parser.parse_args()
+
+    if args.payloads == "csv":
+        payloads = csv_payloads(args.data)
+    else:
+        payloads = domain_payloads(args.requests * args.batch_size)
+    requests = make_requests(payloads, args.endpoint, args.batch_size, args.requests)
+    rows_per_request = args.batch_size if args.endpoint == "batch" else 1
+    print(
+        f"{args.requests} {args.endpoint} requests of {rows_per_request} rows "
+        f"from {args.payloads} payloads\n"
+    )
+
+    results = {}
+    if args.target in ("inprocess", "both"):
+        results["inprocess"] = asyncio.run(
+            run_inprocess(args, requests, rows_per_request)
+        )
+    if args.target in ("server", "both"):
+        results["server"] = asyncio.run(run_server(args, requests, rows_per_request))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
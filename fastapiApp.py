@@ -1,18 +1,88 @@
+import argparse
+import json
+import logging
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import List
 
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field, constr
 
-from src.MushroomClassification.pipeline.prediction import Prediction
+from src.MushroomClassification import logger
+from src.MushroomClassification.config.configuration import \
+    ConfigurationManager
+from src.MushroomClassification.pipeline.batching import MicroBatcher
+from src.MushroomClassification.pipeline.prediction import get_model_registry
+from src.MushroomClassification.pipeline.prediction_cache import \
+    PredictionCache
+from src.MushroomClassification.pipeline.serving_metrics import (
+    BATCHER_MEAN_BATCH_SIZE, BATCHER_QUEUE_DEPTH, CACHE_ENTRIES,
+    CACHE_HIT_RATIO, CONTENT_TYPE, HTTP_REQUEST_SECONDS, HTTP_REQUESTS,
+    PREDICT_REQUESTS, record_prediction, render_metrics)
+from src.MushroomClassification.pipeline.training_jobs import \
+    TrainingJobManager
 
 # load the env variables for the mlflow tracking
 load_dotenv()
 
-app = FastAPI()
+# one JSON record per request with its timing
+request_logger = logger.getChild("requests")
+
+
+def score_batch(records):
+    results, timings, errors = app.state.prediction_cache.classify_many(records)
+    # every record of a batch shares the phase timings of the batch, the ones that could
+    # not be scored get their own error without failing the others
+    return [
+        ValueError(errors[i]) if i in errors else (result, timings)
+        for i, result in enumerate(results)
+    ]
+
+
+def server_timing(timings):
+    """Server-Timing header value of the phase timings of a prediction, in milliseconds."""
+    return ", ".join(
+        f"{phase};dur={seconds * 1e3:.3f}" for phase, seconds in timings.items()
+    )
+
+
+def reload_model(job):
+    job.model_version = get_model_registry().reload().version
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # load the model once at startup so that requests only pay for the prediction
+    registry = get_model_registry()
+    registry.load()
+
+    # answer repeated inputs without running the prediction again
+    app.state.prediction_cache = PredictionCache(registry.config.cache_size)
+
+    # score concurrent /predict requests together, off the event loop
+    app.state.batcher = MicroBatcher(
+        score_batch,
+        max_batch_size=registry.config.batch_max_size,
+        max_wait_ms=registry.config.batch_max_wait_ms,
+    )
+    await app.state.batcher.start()
+
+    # run training in a subprocess and hot-reload the model when it succeeds
+    app.state.training_jobs = TrainingJobManager(
+        ConfigurationManager().get_training_job_config(),
+        on_success=reload_model,
+    )
+    yield
+    await app.state.batcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow CORS
 app.add_middleware(
@@ -24,54 +94,86 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def log_request_timing(request: Request, call_next):
+    start = time.perf_counter()
+    # read by the routes to time the validation of the body
+    request.state.start = start
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # the route template rather than the path, to keep the number of series bounded
+        route = request.scope.get("route")
+        route = route.path if route is not None else "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=status)
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start, method=request.method, route=route
+        )
+        if request_logger.isEnabledFor(logging.INFO):
+            request_logger.info(
+                json.dumps(
+                    {
+                        "method": request.method,
+                        "path": request.url.path,
+                        "status": status,
+                        "duration_ms": round((time.perf_counter() - start) * 1e3, 3),
+                        "model_version": get_model_registry().version,
+                    }
+                )
+            )
+
+
 class Input(BaseModel):
     bruises: str = Field(
-        ..., description="Choose 't' for bruises or 'f' otherwise", pattern="[tf]"
+        ..., description="Choose 't' for bruises or 'f' otherwise", pattern="^[tf]$"
     )
     odor: str = Field(
         ...,
         description="Choose odor from: 'f' for foul smell, 'n' for no smell, or 'o' for other",
-        pattern="[fno]",
+        pattern="^[fno]$",
     )
     gill_spacing: str = Field(
         ...,
         description="Choose gill spacing: 'w' for crowded, 'o' for other",
-        pattern="[wo]",
+        pattern="^[wo]$",
     )
     gill_size: str = Field(
         ...,
         description="Choose gill size: 'b' for broad , 'n' for narrow",
-        pattern="[bn]",
+        pattern="^[bn]$",
     )
     gill_color: str = Field(
         ...,
         description="Choose gill color: 'b' for buff, 'o' for others",
-        pattern="[bo]",
+        pattern="^[bo]$",
     )
     stalk_surface_above_ring: str = Field(
         ...,
         description="Choose stalk surface above ring: 'k' for silky, 's' for smooth, 'o' for others",
-        pattern="[kso]",
+        pattern="^[kso]$",
     )
     stalk_surface_below_ring: str = Field(
         ...,
         description="Choose stalk surface below ring: 'k' for silky, 's' for smooth, 'o' for others",
-        pattern="[kso]",
+        pattern="^[kso]$",
     )
     ring_type: str = Field(
         ...,
         description="Choose ring type: 'l' for large, 'p' for pendant, 'o' for others",
-        pattern="[lpo]",
+        pattern="^[lpo]$",
     )
     spore_print_color: str = Field(
         ...,
         description="Choose spore print color: 'h' for chocolate, 'k' for black, 'n' for brown, 'w' for white, 'o' for others",
-        pattern="[hknwo]",
+        pattern="^[hknwo]$",
     )
     population: str = Field(
         ...,
         description="Choose population: 'v' for several, 'o' for others",
-        pattern="[vo]",
+        pattern="^[vo]$",
     )
 
     class Config:
@@ -91,35 +193,156 @@ class Input(BaseModel):
         }
 
 
+class BatchInput(BaseModel):
+    inputs: List[Input] = Field(..., description="Records to classify in one request")
+
+
 @app.get("/")
 async def home():
     return {
         "message": "Welcome to the Mushroom Classification API --by Sanskar Modi",
-        "/train": "go to this route to start the training pipeline",
+        "/train": "go to this route to start the training pipeline in the background",
+        "/train/{job_id}": "go to this route to follow a training job",
         "/docs": "go to this route to be able to send post request on route /predict for classification",
+        "/predict/batch": "send a post request with many inputs to classify them in one request",
+        "/cache/stats": "go to this route to see the hit, miss and eviction counts of the prediction cache",
+        "/metrics": "go to this route to scrape the request, phase timing and model metrics",
+        "/ready": "readiness probe, answers 200 once the model is resident and 503 before",
+    }
+
+
+@app.get("/model")
+async def model_info():
+    loaded = get_model_registry().get()
+    return {
+        "version": loaded.version,
+        "source": loaded.source,
+        "loaded_at": loaded.loaded_at,
+    }
+
+
+@app.get("/ready")
+async def ready():
+    # readiness probe of the load balancer or orchestrator, per worker process
+    registry = get_model_registry()
+    if not registry.ready:
+        return JSONResponse({"ready": False}, status_code=503)
+    loaded = registry.get()
+    return {
+        "ready": True,
+        "version": loaded.version,
+        "memory_mapped": loaded.memory_mapped,
+        "pid": os.getpid(),
     }
 
 
+@app.get("/predict/stats")
+async def predict_stats():
+    return app.state.batcher.stats()
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return app.state.prediction_cache.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    cache = app.state.prediction_cache.stats()
+    CACHE_ENTRIES.set(cache["size"])
+    CACHE_HIT_RATIO.set(cache["hit_rate"])
+    batcher = app.state.batcher.stats()
+    BATCHER_QUEUE_DEPTH.set(batcher["queue_depth"])
+    BATCHER_MEAN_BATCH_SIZE.set(batcher["mean_batch_size"])
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+
 @app.get("/train")
 async def trainRoute():
-    # os.system("python main.py")
-    os.system("dvc repro")
-    return "Training done successfully!"
+    # start the training pipeline in the background and return at once
+    job = app.state.training_jobs.submit()
+    return {"job_id": job.id, "status": job.status, "status_url": f"/train/{job.id}"}
+
+
+@app.get("/train/{job_id}")
+async def trainStatusRoute(job_id: str, log_lines: int = 100):
+    job = app.state.training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown training job {job_id}")
+    return job.to_dict(log_lines)
 
 
 @app.post("/predict")
-async def predict_route(input: Input):
+async def predict_route(input: Input, request: Request):
+    # the body is read and validated before the route is called
+    validation = time.perf_counter() - request.state.start
     try:
-        # get the result from the Prediction class after passing the input data
-        result = Prediction(input.dict()).classify()
+        # get the result from the batch the input data was scored in
+        start = time.perf_counter()
+        label, timings = await app.state.batcher.submit(input.dict())
+        result = [label]
+
+        # the time not spent scoring the batch was spent waiting for it
+        elapsed = time.perf_counter() - start
+        timings = dict(
+            timings,
+            queue=max(elapsed - sum(timings.values()), 0.0),
+            validation=validation,
+        )
+        record_prediction("/predict", timings, len(result))
 
         # Return the result
-        return JSONResponse({"result": result})
+        return JSONResponse(
+            {"result": result}, headers={"Server-Timing": server_timing(timings)}
+        )
     except Exception as e:
-        print(e)
+        PREDICT_REQUESTS.inc(route="/predict", outcome="error")
+        logger.exception(f"Error classifying the input: {e}")
+        return JSONResponse({"error": str(e)})
+
+
+@app.post("/predict/batch")
+async def predict_batch_route(batch: BatchInput, request: Request):
+    validation = time.perf_counter() - request.state.start
+    try:
+        # classify all the records with a single call to the model
+        result, timings, errors = await run_in_threadpool(
+            app.state.prediction_cache.classify_many,
+            [input.dict() for input in batch.inputs],
+        )
+        timings = dict(timings, validation=validation)
+        record_prediction("/predict/batch", timings, len(result) - len(errors))
+
+        # Return the result, None for the records listed in the errors by position
+        content = {"result": result}
+        if errors:
+            logger.error(f"Error classifying {len(errors)} records of the batch")
+            content["errors"] = errors
+        return JSONResponse(content, headers={"Server-Timing": server_timing(timings)})
+    except Exception as e:
+        PREDICT_REQUESTS.inc(route="/predict/batch", outcome="error")
+        logger.exception(f"Error classifying the batch: {e}")
         return JSONResponse({"error": str(e)})
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve the Mushroom Classification API"
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=80)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("WEB_CONCURRENCY", 1)),
+        help="server processes, see gunicorn.conf.py to load the model before forking",
+    )
+    args = parser.parse_args()
 
-    uvicorn.run(app, host="0.0.0.0", port=80)
+    if args.workers > 1:
+        # every worker process imports the app and loads the model itself
+        uvicorn.run(
+            "fastapiApp:app", host=args.host, port=args.port, workers=args.workers
+        )
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,34 @@
+"""
+Gunicorn settings to serve the FastAPI app with several worker processes:
+
+    gunicorn fastapiApp:app -c gunicorn.conf.py
+
+The app is imported and the model loaded once in the master process, before the workers
+are forked, so every worker starts with the model resident and shares its memory with the
+others instead of loading its own copy. The compiled tree and lookup table are
+memory-mapped (``prediction.mmap`` in ``config/config.yaml``), so they stay shared after a
+worker hot-reloads a retrained model too. Route traffic to a worker once ``/ready``
+answers 200.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:80")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# import the app in the master, see when_ready
+preload_app = True
+
+timeout = 60
+graceful_timeout = 30
+
+
+def when_ready(server):
+    # load the model before the workers are forked, their lifespan then finds it resident
+    from src.MushroomClassification.pipeline.prediction import \
+        get_model_registry
+
+    get_model_registry().load()
+    server.log.info(f"Model {get_model_registry().version} loaded before forking")
@@ -10,6 +10,8 @@ from src.MushroomClassification.pipeline.stage_03_model_training import \
     model_training_step
 from src.MushroomClassification.pipeline.stage_04_model_evaluation import \
     model_evaluation_step
+from src.MushroomClassification.pipeline.stage_05_model_compilation import \
+    model_compilation_step
 
 # load the env variables for the mlflow tracking
 load_dotenv()
@@ -21,4 +23,5 @@ if __name__ == "__main__":
         data_transformation_step(),
         model_training_step(),
         model_evaluation_step(),
+        model_compilation_step(),
     ).run()
@@ -0,0 +1,196 @@
+"""
+Check the HTTP data ingestion against a local stand-in server.
+
+A ``http.server`` serving a random payload from memory plays the data source, with range
+requests enabled or ignored and, optionally, connections dropped part way. Four cases are
+checked: resuming a dropped download, a segmented download, the fallback to a single
+request when the server ignores ``Range``, and a checksum mismatch. Run from the
+repository root:
+
+    python scripts/check_http_ingestion.py
+"""
+
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# make the repository root importable when run as ``python scripts/<script>.py``
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.MushroomClassification.components.data_ingestion import \
+    HTTPDataIngestion
+from src.MushroomClassification.entity.config_entity import DataIngestionConfig
+
+PAYLOAD = os.urandom(3 * 2**20 + 12345)
+SHA256 = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves ``server.payload``, honouring ``Range`` only if ``server.ranges`` is set."""
+
+    def do_GET(self):
+        server = self.server
+        header = self.headers.get("Range")
+        server.requests.append(header)
+        payload = server.payload
+
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", header or "")
+        if server.ranges and match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(payload) - 1
+            if start >= len(payload):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(payload)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = payload[start : end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+        else:
+            body = payload
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        # drop the connection of the first transfer that is not a probe
+        if server.drop_after is not None and len(body) > 1:
+            body, server.drop_after = body[: server.drop_after], None
+            self.close_connection = True
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client only wanted the headers, e.g. a probe answered with the whole file
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer:
+    def __init__(self, ranges=True, drop_after=None):
+        """
+        Local HTTP server playing the data source, run in a background thread.
+
+        :param ranges: whether range requests are honoured or the whole file is sent
+        :param drop_after: bytes sent before the first transfer is cut, None to never cut
+        """
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.httpd.payload = PAYLOAD
+        self.httpd.ranges = ranges
+        self.httpd.drop_after = drop_after
+        self.httpd.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/mushrooms.zip"
+
+    @property
+    def requests(self):
+        """``Range`` header of every request received, None when there was none."""
+        return self.httpd.requests
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_ingestion(url, root, segments=1, sha256=SHA256):
+    config = DataIngestionConfig(
+        root_dir=root,
+        source_url=url,
+        file_path=root / "data.zip",
+        unzip_dir=root,
+        sha256=sha256,
+        download_segments=segments,
+        extract_mode="none",
+        extract_manifest=root / "extract_manifest.json",
+    )
+    return HTTPDataIngestion(config)
+
+
+def downloaded(ingestion):
+    return Path(ingestion.config.file_path).read_bytes() == PAYLOAD
+
+
+def check_resume(root):
+    with StandInServer(drop_after=2**20) as server:
+        ingestion = make_ingestion(server.url, root)
+        try:
+            ingestion.download_file()
+        except ConnectionError:
+            pass
+        else:
+            raise AssertionError("the dropped connection was not reported")
+        assert os.path.getsize(ingestion.partial_path) == 2**20
+
+        ingestion.download_file()
+        assert downloaded(ingestion)
+        assert server.requests[-1] == f"bytes={2**20}-", server.requests
+
+
+def check_segments(root):
+    with StandInServer() as server:
+        ingestion = make_ingestion(server.url, root, segments=4)
+        ingestion.download_file()
+        assert downloaded(ingestion)
+        segments = [r for r in server.requests if r != "bytes=0-0"]
+        assert len(segments) == 4, server.requests
+        assert not list(root.glob("*.part*"))
+
+
+def check_no_range_fallback(root):
+    with StandInServer(ranges=False) as server:
+        ingestion = make_ingestion(server.url, root, segments=4)
+        # a part file left by an earlier attempt is discarded, not appended to
+        Path(ingestion.partial_path).write_bytes(b"stale bytes")
+        ingestion.download_file()
+        assert downloaded(ingestion)
+        assert len(server.requests) == 2, server.requests
+
+
+def check_checksum_mismatch(root):
+    with StandInServer() as server:
+        ingestion = make_ingestion(server.url, root, segments=4, sha256="0" * 64)
+        try:
+            ingestion.download_file()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("the checksum mismatch was not reported")
+        assert not os.path.exists(ingestion.config.file_path)
+        assert not os.path.exists(ingestion.partial_path)
+
+
+CHECKS = [
+    check_resume,
+    check_segments,
+    check_no_range_fallback,
+    check_checksum_mismatch,
+]
+
+
+def main():
+    failed = 0
+    for check in CHECKS:
+        with tempfile.TemporaryDirectory() as root:
+            try:
+                check(Path(root))
+                print(f"ok      {check.__name__}")
+            except Exception as e:
+                failed += 1
+                print(f"FAILED  {check.__name__}: {type(e).__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Check that records with values outside the domain of their field are handled.
+
+``Prediction.classify_many`` must score such records the way ``Prediction.classify``
+scores them one at a time, and the API must reject them at validation rather than fail
+the request while scoring it. Records that cannot be scored at all, e.g. missing a field,
+must get their own error while the other records of their batch are still scored, by
+``classify_many``, the prediction cache and the micro-batcher alike. Needs a trained
+model in ``artifacts/``, run from the repository root:
+
+    python scripts/check_prediction_inputs.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# make the repository root importable when run as ``python scripts/<script>.py``
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.MushroomClassification.pipeline.batching import MicroBatcher
+from src.MushroomClassification.pipeline.prediction import Prediction
+from src.MushroomClassification.pipeline.prediction_cache import \
+    PredictionCache
+
+RECORD = {
+    "bruises": "f",
+    "odor": "f",
+    "gill_spacing": "o",
+    "gill_size": "b",
+    "gill_color": "o",
+    "stalk_surface_above_ring": "k",
+    "stalk_surface_below_ring": "k",
+    "ring_type": "l",
+    "spore_print_color": "h",
+    "population": "v",
+}
+
+# values longer than one character, empty, non ASCII or unknown to the field
+OUTSIDE = [
+    dict(RECORD, odor="xn"),
+    dict(RECORD, odor="nn", population="vv"),
+    dict(RECORD, odor=""),
+    dict(RECORD, ring_type="é"),
+    dict(RECORD, bruises="z"),
+]
+
+# records that cannot be scored at all
+BROKEN = [
+    {key: value for key, value in RECORD.items() if key != "odor"},
+    dict(RECORD, odor=None),
+    dict(RECORD, population=["v"]),
+    "not a record",
+]
+
+
+def check_classify_many_matches_classify():
+    for records in [OUTSIDE, [RECORD] + OUTSIDE + [RECORD], [RECORD] * 3]:
+        expected = [Prediction(record).classify()[0] for record in records]
+        assert Prediction(records).classify_many() == expected, records
+
+
+def check_broken_records_get_their_own_error():
+    expected = Prediction(RECORD).classify()[0]
+    records = [RECORD] + BROKEN + [RECORD]
+    broken = set(range(1, len(BROKEN) + 1))
+
+    prediction = Prediction(records)
+    results = prediction.classify_many()
+    assert set(prediction.errors) == broken, prediction.errors
+    assert results == [expected] + [None] * len(BROKEN) + [expected], results
+
+    for cache in [PredictionCache(), PredictionCache(max_size=0)]:
+        for _ in range(2):
+            results, _, errors = cache.classify_many(records)
+            assert set(errors) == broken, errors
+            assert results == [expected] + [None] * len(BROKEN) + [expected], results
+
+
+def check_batcher_scores_the_other_items():
+    def score_batch(items):
+        calls.append(len(items))
+        return [ValueError(item) if item < 0 else item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(score_batch, max_wait_ms=500)
+        await batcher.start()
+
+        # a single item is scored at once rather than after the whole window
+        start = time.perf_counter()
+        assert await batcher.submit(1) == 2
+        assert time.perf_counter() - start < 0.25
+
+        # concurrent items share a batch, only the bad one fails
+        results = await asyncio.gather(
+            *[batcher.submit(item) for item in [1, -1, 2, 3]],
+            return_exceptions=True,
+        )
+        await batcher.stop()
+        return results
+
+    calls = []
+    results = asyncio.run(run())
+    assert results[0] == 2 and results[2:] == [4, 6], results
+    assert isinstance(results[1], ValueError), results
+    assert calls == [1, 4], calls
+
+
+def check_api_rejects_longer_values():
+    from fastapi.testclient import TestClient
+
+    from fastapiApp import app
+
+    with TestClient(app) as client:
+        response = client.post("/predict", json=RECORD)
+        assert "result" in response.json(), response.json()
+
+        response = client.post("/predict", json=dict(RECORD, odor="xn"))
+        assert response.status_code == 422, response.json()
+
+        batch = {"inputs": [RECORD, dict(RECORD, odor="xn")]}
+        response = client.post("/predict/batch", json=batch)
+        assert response.status_code == 422, response.json()
+
+
+CHECKS = [
+    check_classify_many_matches_classify,
+    check_broken_records_get_their_own_error,
+    check_batcher_scores_the_other_items,
+    check_api_rejects_longer_values,
+]
+
+
+def main():
+    failed = 0
+    for check in CHECKS:
+        try:
+            check()
+            print(f"ok      {check.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"FAILED  {check.__name__}: {type(e).__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,101 @@
+import atexit
+import copy
 import logging
 import os
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 
 # format of the logging message
 logging_str = "[%(asctime)s]: %(message)s:"
 
-# create logs folder if not exists
+# level of the package logs, e.g. DEBUG to also log the full EDA summaries
+log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
+
 log_dir = "logs"
 log_filepath = os.path.join(log_dir, "running_logs.log")
-os.makedirs(log_dir, exist_ok=True)
-
-# set the config
-logging.basicConfig(
-    level=logging.INFO,
-    format=logging_str,
-    handlers=[logging.FileHandler(log_filepath), logging.StreamHandler(sys.stdout)],
-)
+
+
+class LazyFileHandler(logging.FileHandler):
+    """File handler creating the logs folder and opening the file on the first record, not at import"""
+
+    def __init__(self, filename):
+        super().__init__(filename, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue handler leaving the formatting of the records to the listener thread"""
+
+    # marks the handler installed on the root logger, see _installed_handler
+    mushroom_classification = True
+
+    def prepare(self, record):
+        # the arguments and traceback are rendered now, like QueueHandler does, as they
+        # may have changed or be gone once the listener gets the record; the listener's
+        # handlers only add the timestamp
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _installed_handler():
+    """
+    Queue handler of the root logger, if the logging was set up by this module already.
+
+    The package is imported both as ``src.MushroomClassification`` by the top-level
+    scripts and as ``MushroomClassification`` by its own modules, so this module runs
+    twice per process. The handler is recognised by its marker, as each copy of the
+    module has its own DeferredQueueHandler class.
+    """
+    for handler in logging.getLogger().handlers:
+        if getattr(handler, "mushroom_classification", False):
+            return handler
+    return None
+
+
+def _stop_listener():
+    log_listener.stop()
+
+
+def _restart_listener():
+    """Start a listener in a forked child, whose copy of the parent's thread is gone"""
+    global log_queue, log_listener
+    # a new queue, as the parent's listener thread may have held the lock of the old one
+    # at the fork; the records queued before the fork are written by the parent
+    log_queue = queue.SimpleQueue()
+    _installed_handler().queue = log_queue
+    log_listener = QueueListener(log_queue, file_handler, stream_handler)
+    log_listener.start()
+
+
+# the file and console handlers run in a background thread fed by a queue, so logging
+# never blocks the caller on I/O
+formatter = logging.Formatter(logging_str)
+if _installed_handler() is None:
+    file_handler = LazyFileHandler(log_filepath)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    log_listener = QueueListener(log_queue, file_handler, stream_handler)
+    log_listener.start()
+
+    atexit.register(_stop_listener)
+    # e.g. gunicorn workers forked from a preloaded master, or fork-based process pools
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_restart_listener)
+
+    # set the config
+    logging.basicConfig(level=log_level, handlers=[DeferredQueueHandler(log_queue)])
 
 # create an object of the logger
 logger = logging.getLogger("mushroomClassificationLogger")
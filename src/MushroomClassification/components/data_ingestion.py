@@ -1,11 +1,25 @@
 import abc
 import os
+import shutil
+import urllib.error
+import urllib.request
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import unquote, urlparse
 
 import gdown
 
 from MushroomClassification import logger
 from MushroomClassification.entity.config_entity import DataIngestionConfig
+from MushroomClassification.utils.common import (get_file_hash, load_json,
+                                                 save_json)
+
+# seconds to wait for the server before a request is considered failed
+HTTP_TIMEOUT = 30
+
+# size of the blocks streamed from the server to disk
+HTTP_BLOCK_SIZE = 1 << 20
 
 
 # Abstract Base Class
@@ -22,19 +36,102 @@ class AbstractDataIngestion(abc.ABC):
         """Download the file from the given source URL"""
         pass
 
-    @abc.abstractmethod
+    @property
+    def partial_path(self) -> str:
+        """Path the file is downloaded to, renamed to ``file_path`` once complete and verified"""
+        return f"{self.config.file_path}.part"
+
+    def verify_file(self, path) -> bool:
+        """
+        Check the file against the configured sha256 checksum
+        :param path: path of the file to check
+        :return: True if the checksum matches or none is configured
+        """
+        if not self.config.sha256:
+            return True
+        digest = get_file_hash(Path(path))
+        if digest != self.config.sha256.lower():
+            logger.error(
+                f"Checksum mismatch for {path}: expected {self.config.sha256}, got {digest}"
+            )
+            return False
+        return True
+
+    def is_downloaded(self) -> bool:
+        """
+        Whether the complete file is already there. A file failing the checksum is removed so that it is downloaded again
+        """
+        if not os.path.exists(self.config.file_path):
+            return False
+        if self.verify_file(self.config.file_path):
+            return True
+        os.remove(self.config.file_path)
+        return False
+
+    def complete_download(self):
+        """
+        Verify the downloaded file and move it into place
+        """
+        if not self.verify_file(self.partial_path):
+            os.remove(self.partial_path)
+            raise ValueError(
+                f"Downloaded file failed the checksum: {self.partial_path}"
+            )
+        os.replace(self.partial_path, self.config.file_path)
+
     def extract_zip_file(self):
-        """Extract the downloaded zip file"""
-        pass
+        """
+        Extract the zip file into the configured data directory, according to ``extract_mode``:
+        "all" extracts every member, "changed" only the members whose CRC or size differ
+        from the previous extraction recorded in the manifest, or that are missing on disk,
+        and "none" leaves the archive packed for the transformation to stream the CSV out of it
+        """
+        extract_mode = self.config.extract_mode
+        if extract_mode not in ("all", "changed", "none"):
+            raise ValueError(f"Unsupported extract mode: {extract_mode}")
+        if extract_mode == "none":
+            logger.info("Archive left packed, the data is streamed out of it")
+            return
+
+        try:
+            unzip_path = self.config.unzip_dir
+            manifest_path = Path(self.config.extract_manifest)
+            manifest = {}
+            if extract_mode == "changed" and manifest_path.exists():
+                manifest = load_json(manifest_path).to_dict()
+
+            extracted = 0
+            with zipfile.ZipFile(self.config.file_path, "r") as zip_ref:
+                members = [info for info in zip_ref.infolist() if not info.is_dir()]
+                for info in members:
+                    entry = {"crc": info.CRC, "size": info.file_size}
+                    target = Path(unzip_path) / info.filename
+                    if (
+                        manifest.get(info.filename) == entry
+                        and target.exists()
+                        and target.stat().st_size == info.file_size
+                    ):
+                        continue
+                    zip_ref.extract(info, unzip_path)
+                    manifest[info.filename] = entry
+                    extracted += 1
+
+            save_json(path=manifest_path, data=manifest)
+            logger.info(
+                f"Extracted {extracted} of {len(members)} members of the zip file to {unzip_path}"
+            )
+        except Exception as e:
+            logger.error(f"Error occurred while extracting zip file: {e}")
+            raise e
 
 
 # Concrete Class that implements the abstract methods
 class GDriveDataIngestion(AbstractDataIngestion):
     def download_file(self):
         """
-        Fetch data from Google Drive URL
+        Fetch data from Google Drive URL, resuming a partial download
         """
-        if os.path.exists(self.config.file_path):
+        if self.is_downloaded():
             return
         else:
             try:
@@ -47,7 +144,8 @@ class GDriveDataIngestion(AbstractDataIngestion):
                 file_id = dataset_url.split("/")[-2]
                 prefix = "https://drive.google.com/uc?/export=download&id="
 
-                gdown.download(prefix + file_id, zip_download_path)
+                gdown.download(prefix + file_id, self.partial_path, resume=True)
+                self.complete_download()
                 logger.info(
                     f"Downloaded data from {dataset_url} into file {zip_download_path}"
                 )
@@ -56,17 +154,128 @@ class GDriveDataIngestion(AbstractDataIngestion):
                 logger.error(f"Error occurred while downloading data: {e}")
                 raise e
 
-    def extract_zip_file(self):
+
+class HTTPDataIngestion(AbstractDataIngestion):
+    def _request(self, headers=None):
+        request = urllib.request.Request(self.config.source_url, headers=headers or {})
+        return urllib.request.urlopen(request, timeout=HTTP_TIMEOUT)
+
+    def probe(self):
         """
-        Extract the zip file into the configured data directory
+        Ask the server for the size of the file and whether it serves byte ranges
+        :return: (size or None, True if range requests are supported)
         """
+        with self._request({"Range": "bytes=0-0"}) as response:
+            if response.status == 206:
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                return (int(total) if total.isdigit() else None), True
+            length = response.headers.get("Content-Length")
+            return (int(length) if length else None), False
+
+    def _fetch(self, path, start=0, end=None):
+        """
+        Append bytes ``start`` to ``end`` (inclusive, None for the end of the file) to ``path``,
+        resuming from the bytes already in it
+        """
+        done = os.path.getsize(path) if os.path.exists(path) else 0
+        if end is not None and start + done > end:
+            return
+
+        headers = {}
+        if start + done or end is not None:
+            headers["Range"] = f"bytes={start + done}-{'' if end is None else end}"
         try:
-            unzip_path = self.config.unzip_dir
-            with zipfile.ZipFile(self.config.file_path, "r") as zip_ref:
-                zip_ref.extractall(unzip_path)
-            logger.info(f"Extracted zip file to {unzip_path}")
+            response = self._request(headers)
+        except urllib.error.HTTPError as e:
+            # nothing left to fetch, the part file is already complete
+            if e.code == 416 and done:
+                return
+            raise e
+        with response:
+            # the server ignored the range and sends the whole file, start over
+            mode = "ab" if response.status == 206 else "wb"
+            with open(path, mode) as f:
+                offset = f.tell()
+                shutil.copyfileobj(response, f, HTTP_BLOCK_SIZE)
+                received = f.tell() - offset
+
+        # a dropped connection ends the stream early, keep the part file to resume from
+        expected = response.headers.get("Content-Length")
+        if expected is not None and received < int(expected):
+            raise ConnectionError(
+                f"Connection closed after {received} of {expected} bytes of {path}"
+            )
+
+    def download_file(self):
+        """
+        Fetch data from an HTTP(S) URL, resuming partial downloads with range requests.
+
+        When the server supports ranges and ``download_segments`` is above 1, the file is
+        split into that many segments fetched in parallel, each into its own part file
+        that is resumed independently, then joined.
+        """
+        if self.is_downloaded():
+            return
+        try:
+            dataset_url = self.config.source_url
+            logger.info(
+                f"Downloading data from {dataset_url} into file {self.config.file_path}"
+            )
+            size, ranges = self.probe()
+            segments = self.config.download_segments
+            if ranges and size and segments > 1 and size >= segments:
+                self._download_segments(size, segments)
+            else:
+                self._fetch(self.partial_path)
+            self.complete_download()
+            logger.info(
+                f"Downloaded data from {dataset_url} into file {self.config.file_path}"
+            )
         except Exception as e:
-            logger.error(f"Error occurred while extracting zip file: {e}")
+            logger.error(f"Error occurred while downloading data: {e}")
+            raise e
+
+    def _download_segments(self, size, segments):
+        bounds = [size * i // segments for i in range(segments + 1)]
+        parts = [f"{self.partial_path}.{i}" for i in range(segments)]
+        with ThreadPoolExecutor(max_workers=segments) as pool:
+            futures = [
+                pool.submit(self._fetch, part, start, end - 1)
+                for part, start, end in zip(parts, bounds[:-1], bounds[1:])
+            ]
+            for future in futures:
+                future.result()
+
+        with open(self.partial_path, "wb") as f:
+            for part in parts:
+                with open(part, "rb") as segment:
+                    shutil.copyfileobj(segment, f, HTTP_BLOCK_SIZE)
+        for part in parts:
+            os.remove(part)
+
+
+class LocalFileDataIngestion(AbstractDataIngestion):
+    @property
+    def source_path(self) -> str:
+        parsed = urlparse(self.config.source_url)
+        if parsed.scheme == "file":
+            return unquote(parsed.path)
+        return self.config.source_url
+
+    def download_file(self):
+        """
+        Copy the data from a local file or a file:// URL
+        """
+        if self.is_downloaded():
+            return
+        try:
+            shutil.copyfile(self.source_path, self.partial_path)
+            self.complete_download()
+            logger.info(
+                f"Copied data from {self.source_path} into file {self.config.file_path}"
+            )
+        except Exception as e:
+            logger.error(f"Error occurred while copying data: {e}")
             raise e
 
 
@@ -80,8 +289,13 @@ class DataIngestion:
         """
         Factory method to return the appropriate DataIngestion class
         """
-        if self.config.source_url.startswith("https://drive.google.com"):
+        source_url = self.config.source_url
+        if source_url.startswith("https://drive.google.com"):
             return GDriveDataIngestion(self.config)
+        elif source_url.startswith(("http://", "https://")):
+            return HTTPDataIngestion(self.config)
+        elif source_url.startswith("file://") or os.path.exists(source_url):
+            return LocalFileDataIngestion(self.config)
         else:
-            # Here, we can extend this logic for other sources like AWS S3, HTTP URLs, etc.
+            # Here, we can extend this logic for other sources like AWS S3, etc.
             raise ValueError("Unsupported data source URL")
@@ -1,12 +1,70 @@
+import io
+import logging
 from abc import ABC, abstractmethod
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from sklearn.feature_selection import SelectKBest, f_classif
+from sklearn.feature_selection import SelectKBest
 from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
 
 from MushroomClassification import logger
 from MushroomClassification.entity.config_entity import \
     DataTransformationConfig
+from MushroomClassification.utils.common import (DataFrameWriter,
+                                                 open_data_file,
+                                                 save_dataframe, save_json)
+from MushroomClassification.utils.feature_scoring import FeatureScorer
+from MushroomClassification.utils.profiler import profile_section
+
+
+def build_encoder_artifact(categories, selected_mask):
+    """
+    Describe a one-hot encoding and the features selected from it for the serving path.
+
+    The artifact holds the categories of every encoded column, the full list of one-hot
+    features with the mask of the selected ones, and a ``column_index`` map from every
+    column and category to the index of its selected feature.
+
+    :param categories: dict mapping every encoded column to its sorted categories
+    :param selected_mask: boolean mask over the one-hot features, in encoding order
+    :return: dict that can be saved as JSON
+    """
+    feature_names = [
+        f"{col}_{category}" for col, values in categories.items() for category in values
+    ]
+    selected_features = [
+        name for name, keep in zip(feature_names, selected_mask) if keep
+    ]
+    position = {name: i for i, name in enumerate(selected_features)}
+
+    column_index = {}
+    for col, values in categories.items():
+        index = {c: position[f"{col}_{c}"] for c in values if f"{col}_{c}" in position}
+        if index:
+            column_index[col] = index
+
+    return {
+        "categories": categories,
+        "feature_names": feature_names,
+        "selected_mask": [bool(keep) for keep in selected_mask],
+        "selected_features": selected_features,
+        "column_index": column_index,
+    }
+
+
+def select_top_k(scores, k):
+    """
+    Boolean mask of the k best scores, the way SelectKBest breaks ties and handles NaN.
+
+    :param scores: array of feature scores
+    :param k: number of features to keep
+    :return: boolean mask over the features
+    """
+    scores = np.where(np.isnan(scores), np.finfo(np.float64).min, scores)
+    mask = np.zeros(len(scores), dtype=bool)
+    mask[np.argsort(scores, kind="mergesort")[-k:]] = True
+    return mask
 
 
 # Define Abstract Base Class for EDA Strategy
@@ -42,6 +100,13 @@ class FeatureEngineeringStrategy(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_encoder_artifact(self):
+        """
+        Describe the fitted encoding and feature selection for the serving path.
+        """
+        pass
+
 
 # Concrete Strategy for EDA
 class EDAConcreteStrategy(EDAAnalysisStrategy):
@@ -51,14 +116,134 @@ class EDAConcreteStrategy(EDAAnalysisStrategy):
         Perform basic EDA operations, e.g., describe, info, value counts.
         """
         logger.info("Performing EDA:")
-        logger.info(df.describe())
-        logger.info(df.info())
+
+        # the summaries are expensive to build, skip them unless they are logged
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+
+        logger.debug(df.describe())
+        buffer = io.StringIO()
+        df.info(buf=buffer)
+        logger.debug(buffer.getvalue())
         for col in df.select_dtypes(include=["object"]).columns:
-            logger.info(f"{col} value counts: \n{df[col].value_counts()}")
+            logger.debug(f"{col} value counts: \n{df[col].value_counts()}")
+
+
+class EDAProfilingStrategy(EDAAnalysisStrategy):
+    def __init__(self, profile_path, sample_size=0, random_state=42, max_values=50):
+        """
+        Profiles every column in a single vectorized pass and saves the profile as JSON.
+
+        Every column is factorized into integer codes, missing values getting their own
+        code, and the codes of all columns are offset into one range counted by a single
+        ``numpy.bincount``. Cardinalities, frequencies, most frequent values and null
+        counts all follow from those counts.
+
+        :param profile_path: path of the JSON profile
+        :param sample_size: profile a random sample of at most this many rows, 0 profiles every row
+        :param random_state: seed of the sample
+        :param max_values: columns with at most this many distinct values get their full frequencies
+        """
+        self.profile_path = profile_path
+        self.sample_size = sample_size
+        self.random_state = random_state
+        self.max_values = max_values
+
+    def profile(self, df):
+        """
+        Build the profile of a DataFrame.
+
+        :param df: data to profile
+        :return: dict with the number of rows and the profile of every column
+        """
+        rows = len(df)
+        sampled = bool(self.sample_size) and rows > self.sample_size
+        if sampled:
+            df = df.sample(n=self.sample_size, random_state=self.random_state)
+
+        # codes shifted by one so that missing values (-1) count at the offset of their column
+        factorized = [pd.factorize(df[col], use_na_sentinel=True) for col in df.columns]
+        sizes = np.array([len(uniques) + 1 for _, uniques in factorized])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        codes = np.stack([c for c, _ in factorized], axis=1) + 1 + offsets
+        counts = np.bincount(codes.ravel(), minlength=sizes.sum())
+
+        columns = {}
+        for col, (_, uniques), offset, size in zip(
+            df.columns, factorized, offsets, sizes
+        ):
+            col_counts = counts[offset + 1 : offset + size]
+            profile = {
+                "dtype": str(df[col].dtype),
+                "nulls": int(counts[offset]),
+                "unique": len(uniques),
+            }
+            if len(uniques):
+                top = int(col_counts.argmax())
+                profile["top"] = (
+                    uniques[top].item()
+                    if hasattr(uniques[top], "item")
+                    else uniques[top]
+                )
+                profile["freq"] = int(col_counts[top])
+            if len(uniques) <= self.max_values:
+                order = np.argsort(-col_counts, kind="stable")
+                profile["values"] = {str(uniques[i]): int(col_counts[i]) for i in order}
+            columns[col] = profile
+
+        return {
+            "rows": rows,
+            "profiled_rows": len(df),
+            "sampled": sampled,
+            "columns": columns,
+        }
+
+    def execute(self, df):
+        """
+        Profile the data, save the profile and log what matters for the preprocessing.
+        """
+        profile = self.profile(df)
+        save_json(path=Path(self.profile_path), data=profile)
+
+        constant = [
+            col for col, stats in profile["columns"].items() if stats["unique"] <= 1
+        ]
+        with_nulls = [
+            col for col, stats in profile["columns"].items() if stats["nulls"]
+        ]
+        logger.info(
+            f"Profiled {profile['profiled_rows']} of {profile['rows']} rows and "
+            f"{len(profile['columns'])} columns, constant columns: {constant}, "
+            f"columns with nulls: {with_nulls}"
+        )
+
+
+class NoEDAStrategy(EDAAnalysisStrategy):
+    def execute(self, df):
+        """
+        Skip the exploratory data analysis, e.g. for production runs.
+        """
+        logger.info("EDA disabled")
 
 
 # Concrete Strategy for Feature Engineering
 class FeatureEngineeringConcreteStrategy(FeatureEngineeringStrategy):
+    ENCODINGS = ("dense", "uint8", "sparse")
+
+    def __init__(self, encoding="dense", feature_scoring="f_classif"):
+        """
+        :param encoding: how the one-hot encoded data is held in memory:
+            "dense" for an int64 matrix, "uint8" for a dense uint8 matrix, or "sparse"
+            for a sparse uint8 DataFrame that is only densified after feature selection
+        :param feature_scoring: score the features are selected by, see ``FeatureScorer``
+        """
+        if encoding not in self.ENCODINGS:
+            raise ValueError(
+                f"Unknown encoding {encoding!r}, expected one of {self.ENCODINGS}"
+            )
+        self.encoding = encoding
+        self.scorer = FeatureScorer(feature_scoring)
+
     def preprocess(self, X, y):
         """
         Preprocess the given DataFrame X and target vector y.
@@ -70,7 +255,7 @@ class FeatureEngineeringConcreteStrategy(FeatureEngineeringStrategy):
         3. One-hot encode all other categorical columns using a OneHotEncoder.
         4. Convert the encoded data to a DataFrame.
         5. Add the target column to the DataFrame.
-        6. Convert the DataFrame to integers.
+        6. Convert the DataFrame to integers, unless it was encoded as uint8 or sparse.
 
         :param X: Input DataFrame
         :param y: Target vector
@@ -86,19 +271,32 @@ class FeatureEngineeringConcreteStrategy(FeatureEngineeringStrategy):
 
         # One-hot encode all other categorical columns
         cat_cols = [col for col in X.columns if X[col].dtype == "object"]
-        encoder = OneHotEncoder(sparse_output=False)  # Ensure dense output
+        if self.encoding == "dense":
+            encoder = OneHotEncoder(sparse_output=False)  # Ensure dense output
+        else:
+            encoder = OneHotEncoder(
+                sparse_output=self.encoding == "sparse", dtype=np.uint8
+            )
         data_encoded = encoder.fit_transform(X[cat_cols])
 
+        # Keep the fitted encoder to describe it to the serving path
+        self.encoder, self.cat_cols = encoder, cat_cols
+
         # Convert encoded data to DataFrame
-        df_encoded = pd.DataFrame(
-            data_encoded, columns=encoder.get_feature_names_out(cat_cols)
-        )
+        feature_names = encoder.get_feature_names_out(cat_cols)
+        if self.encoding == "sparse":
+            df_encoded = pd.DataFrame.sparse.from_spmatrix(
+                data_encoded, columns=feature_names
+            )
+        else:
+            df_encoded = pd.DataFrame(data_encoded, columns=feature_names)
 
         # Add target column to the DataFrame
-        df_encoded["class"] = y.values
+        df_encoded["class"] = y.values.astype(np.uint8)
 
         # Convert to integers
-        df_encoded = df_encoded.astype("int")
+        if self.encoding == "dense":
+            df_encoded = df_encoded.astype("int")
 
         logger.info(
             "Removed all constant features and encoded all categorical columns."
@@ -109,14 +307,17 @@ class FeatureEngineeringConcreteStrategy(FeatureEngineeringStrategy):
         """
         Selects the top k features from the given DataFrame X and target vector y.
 
-        This function uses SelectKBest with the f_classif scoring function to select the top k features.
+        This function uses SelectKBest with a FeatureScorer to select the top k features. The
+        scores are computed from class-conditional counts, without float64 copies of the
+        one-hot matrix. A sparse DataFrame is handed to SelectKBest as a sparse matrix, and
+        only the k selected columns are densified.
 
         :param X: Input DataFrame
         :param y: Target vector
         :param k: Number of features to select (default is 19)
         :return: DataFrame with the top k features and the target column
         """
-        selector = SelectKBest(score_func=f_classif, k=k)
+        selector = SelectKBest(score_func=self.scorer, k=k)
 
         # Drop target column for feature selection
         X_features = X.drop(columns=["class"])
@@ -126,14 +327,34 @@ class FeatureEngineeringConcreteStrategy(FeatureEngineeringStrategy):
 
         # Extract selected feature names
         selected_feature_names = X_features.columns[selector.get_support()]
+        self.selector = selector
 
         # Create DataFrame with selected features and target
+        if self.encoding == "sparse":
+            X_new = X_new.toarray()
         final_df = pd.DataFrame(X_new, columns=selected_feature_names)
         final_df["class"] = y.values
 
         logger.info("Applied feature selection using SelectKBest.")
         return final_df
 
+    def get_encoder_artifact(self):
+        """
+        Describes the fitted OneHotEncoder and SelectKBest so that serving can encode inputs
+        without fitting anything.
+
+        The artifact holds the categories of every encoded column, the full list of one-hot
+        features with the mask of the selected ones, and a ``column_index`` map from every
+        column and category to the index of its selected feature.
+
+        :return: dict that can be saved as JSON
+        """
+        categories = {
+            col: [str(c) for c in col_categories]
+            for col, col_categories in zip(self.cat_cols, self.encoder.categories_)
+        }
+        return build_encoder_artifact(categories, self.selector.get_support())
+
     def remove_outliers(self, X):
         """
         Removes outliers from the given DataFrame X using the IQR method for numerical columns.
@@ -170,6 +391,126 @@ class FeatureEngineeringConcreteStrategy(FeatureEngineeringStrategy):
         return X.loc[num_cols_filtered.index]
 
 
+# Two-pass feature engineering over a CSV read in chunks
+class StreamingFeatureEngineering:
+    def __init__(
+        self, data_path, chunksize, k=19, archive_path=None, feature_scoring="f_classif"
+    ):
+        """
+        Encodes and selects features of a CSV file too large to be loaded at once.
+
+        The first pass counts every (column, category, class) combination, which gives the
+        category vocabularies, the constant columns and the class-conditional counts the
+        feature scores are computed from. The second pass one-hot encodes only the selected
+        features chunk by chunk and appends them to the output. Memory stays bounded by the
+        chunk size and the vocabularies. All columns are read as categorical strings.
+
+        :param data_path: path to the raw CSV with a "class" column of "e"/"p" labels
+        :param chunksize: number of rows read at a time
+        :param k: number of features to select
+        :param archive_path: zip archive the CSV is streamed out of, if it is not extracted
+        :param feature_scoring: score the features are selected by, see ``FeatureScorer``
+        """
+        self.data_path = data_path
+        self.chunksize = chunksize
+        self.k = k
+        self.archive_path = archive_path
+        self.scorer = FeatureScorer(feature_scoring)
+
+    def read_chunks(self):
+        with open_data_file(self.data_path, self.archive_path) as f:
+            yield from pd.read_csv(f, chunksize=self.chunksize, dtype=str)
+
+    def read_first_chunk(self) -> pd.DataFrame:
+        """Read only the first chunk, closing the file rather than leaving a reader open."""
+        with open_data_file(self.data_path, self.archive_path) as f:
+            return pd.read_csv(f, nrows=self.chunksize, dtype=str)
+
+    def collect_statistics(self):
+        """
+        First pass: count every category of every column per class.
+
+        :return: None, sets ``categories``, ``class_counts`` and ``feature_class_counts``
+        """
+        counts = {}
+        rows = 0
+        for chunk in self.read_chunks():
+            y = chunk["class"].map({"e": 0, "p": 1})
+            for col in chunk.columns.drop("class"):
+                chunk_counts = chunk.groupby([chunk[col], y]).size()
+                if col in counts:
+                    chunk_counts = chunk_counts.add(counts[col], fill_value=0)
+                counts[col] = chunk_counts
+            rows += len(chunk)
+
+        # Remove constant features and sort the categories like OneHotEncoder does
+        self.categories = {}
+        for col, col_counts in counts.items():
+            values = sorted(col_counts.index.get_level_values(0).unique())
+            if len(values) > 1:
+                self.categories[col] = values
+
+        class_counts = next(iter(counts.values())).groupby(level=1).sum()
+        self.class_counts = class_counts.reindex([0, 1], fill_value=0).to_numpy()
+        self.feature_class_counts = np.array(
+            [
+                [
+                    counts[col].get((value, c), 0)
+                    for col, values in self.categories.items()
+                    for value in values
+                ]
+                for c in (0, 1)
+            ]
+        )
+        logger.info(
+            f"Collected statistics of {rows} rows and "
+            f"{self.feature_class_counts.shape[1]} encoded features"
+        )
+
+    def select_features(self):
+        """
+        Select the top k features by their score, like SelectKBest with the same scorer.
+
+        :return: boolean mask over the encoded features
+        """
+        scores, _ = self.scorer.score_counts(
+            self.class_counts, self.feature_class_counts
+        )
+        self.selected_mask = select_top_k(scores, self.k)
+        self.encoder_artifact = build_encoder_artifact(
+            self.categories, self.selected_mask
+        )
+        logger.info("Applied feature selection from the class-conditional counts.")
+        return self.selected_mask
+
+    def write_transformed(self, path):
+        """
+        Second pass: encode the selected features chunk by chunk and append them to ``path``.
+
+        :param path: output artifact, its extension choosing the format
+        """
+        encoded_features = [
+            (col, value) for col, values in self.categories.items() for value in values
+        ]
+        selected = [
+            (f"{col}_{value}", col, value)
+            for (col, value), keep in zip(encoded_features, self.selected_mask)
+            if keep
+        ]
+
+        with DataFrameWriter(Path(path)) as writer:
+            for chunk in self.read_chunks():
+                encoded = pd.DataFrame(
+                    {
+                        name: (chunk[col] == value).to_numpy(np.uint8)
+                        for name, col, value in selected
+                    }
+                )
+                y = chunk["class"].map({"e": 0, "p": 1})
+                encoded["class"] = y.to_numpy(np.uint8)
+                writer.write(encoded)
+
+
 # Context for Data Transformation
 class DataTransformation:
     def __init__(self, data_transformation_config: DataTransformationConfig):
@@ -181,13 +522,31 @@ class DataTransformation:
         """
         self.config = data_transformation_config
 
-        # Load the data
-        self.df = pd.read_csv(self.config.data_path)
-        logger.info("Data CSV loaded")
+        # Load the data, unless it is streamed in chunks
+        if self.config.chunksize:
+            self.df = None
+        else:
+            with open_data_file(self.config.data_path, self.config.archive_path) as f:
+                self.df = pd.read_csv(f)
+            logger.info("Data CSV loaded")
 
         # Define strategies
-        self.eda_strategy = EDAConcreteStrategy()
-        self.feature_engineering_strategy = FeatureEngineeringConcreteStrategy()
+        if self.config.eda == "profile":
+            self.eda_strategy = EDAProfilingStrategy(
+                self.config.profile, sample_size=self.config.eda_sample_size
+            )
+        elif self.config.eda == "full":
+            self.eda_strategy = EDAConcreteStrategy()
+        elif self.config.eda == "off":
+            self.eda_strategy = NoEDAStrategy()
+        else:
+            raise ValueError(
+                f"Unknown EDA mode {self.config.eda!r}, expected profile, full or off"
+            )
+        self.feature_engineering_strategy = FeatureEngineeringConcreteStrategy(
+            encoding=self.config.encoding,
+            feature_scoring=self.config.feature_scoring,
+        )
 
     def transform_data(self):
         """
@@ -197,30 +556,94 @@ class DataTransformation:
         3. Preprocess the data
         4. Remove outliers
         5. Apply feature selection
-        6. Save the transformed data to a CSV file.
+        6. Save the transformed data in the format chosen by its file extension.
+        7. Save the fitted encoder for the serving path.
+
+        When a chunk size is configured the data is streamed instead, see
+        ``transform_data_streaming``.
 
         :return: None
         """
+        if self.config.chunksize:
+            return self.transform_data_streaming()
+
         df = self.df
+        rows = len(df)
 
         # Perform EDA
-        self.eda_strategy.execute(df)
+        with profile_section("eda", rows):
+            self.eda_strategy.execute(df)
 
         # Separate features and target variable
         X = df.drop(columns=["class"])
         y = df["class"]
 
         # Remove outliers for numeric features
-        X = self.feature_engineering_strategy.remove_outliers(X)
+        with profile_section("remove_outliers", rows):
+            X = self.feature_engineering_strategy.remove_outliers(X)
 
         # Preprocess the data
-        preprocessed_df = self.feature_engineering_strategy.preprocess(X, y)
+        with profile_section("preprocess", rows):
+            preprocessed_df = self.feature_engineering_strategy.preprocess(X, y)
 
         # Apply feature selection
-        df_transformed = self.feature_engineering_strategy.select_features(
-            preprocessed_df, preprocessed_df["class"], k=19
+        with profile_section("select_features", len(preprocessed_df)):
+            df_transformed = self.feature_engineering_strategy.select_features(
+                preprocessed_df, preprocessed_df["class"], k=19
+            )
+
+        with profile_section("save", len(df_transformed)):
+            # Save the transformed data
+            save_dataframe(df_transformed, Path(self.config.transformed_data))
+            logger.info(
+                f"Saved transformed data to the directory - {self.config.root_dir}"
+            )
+
+            # Save the fitted encoder
+            save_json(
+                path=Path(self.config.encoder),
+                data=self.feature_engineering_strategy.get_encoder_artifact(),
+            )
+
+    def transform_data_streaming(self):
+        """
+        Transforms the data in bounded memory, reading the CSV in chunks of the configured size:
+        1. Perform exploratory data analysis on the first chunk
+        2. Collect the category vocabularies and class-conditional counts in a first pass
+        3. Select the features from the counts
+        4. Encode and write the selected features chunk by chunk in a second pass
+        5. Save the encoder for the serving path.
+
+        Outlier removal is skipped as every column is categorical.
+
+        :return: None
+        """
+        streaming = StreamingFeatureEngineering(
+            self.config.data_path,
+            self.config.chunksize,
+            k=19,
+            archive_path=self.config.archive_path,
+            feature_scoring=self.config.feature_scoring,
         )
 
+        # Perform EDA on the first chunk
+        with profile_section("eda") as section:
+            first_chunk = streaming.read_first_chunk()
+            section["rows"] = len(first_chunk)
+            self.eda_strategy.execute(first_chunk)
+
+        with profile_section("collect_statistics") as section:
+            streaming.collect_statistics()
+            rows = int(streaming.class_counts.sum())
+            section["rows"] = rows
+
+        with profile_section("select_features"):
+            streaming.select_features()
+
         # Save the transformed data
-        df_transformed.to_csv(self.config.transformed_data, index=False)
+        with profile_section("write_transformed", rows):
+            streaming.write_transformed(self.config.transformed_data)
         logger.info(f"Saved transformed data to the directory - {self.config.root_dir}")
+
+        # Save the encoder
+        save_json(path=Path(self.config.encoder), data=streaming.encoder_artifact)
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from MushroomClassification import logger
+from MushroomClassification.constants import INPUT_DOMAIN
+from MushroomClassification.entity.config_entity import ModelCompilationConfig
+from MushroomClassification.utils.common import (get_file_hash, load_bin,
+                                                 save_array, save_json)
+from MushroomClassification.utils.input_encoding import (DOMAIN_SIZE,
+                                                         InputEncoder,
+                                                         domain_codes)
+
+
+class ModelCompilation:
+    def __init__(self, config: ModelCompilationConfig):
+        """
+        Initializes the ModelCompilation object with the given configuration.
+
+        Parameters
+        ----------
+        config : ModelCompilationConfig
+            Configuration for the Model Compilation stage.
+        """
+        self.config = config
+        self.model = load_bin(Path(self.config.model))
+        logger.info("Loaded model")
+
+    def compile_lookup_table(self):
+        """
+        Evaluate the model over every possible prediction input and save the answers.
+
+        The inputs accepted by the prediction service are limited to the small alphabets
+        in INPUT_DOMAIN, so the model can be evaluated once for all of them. The answers
+        are stored as a uint8 array indexed by the mixed-radix index of the input (see
+        ``record_to_index``), next to a JSON file recording the model version they belong to.
+        """
+        feature_names = list(self.model.feature_names_in_)
+        encoder = InputEncoder(feature_names)
+
+        X = pd.DataFrame(encoder.encode_codes(domain_codes()), columns=feature_names)
+        table = self.model.predict(X).astype(np.uint8)
+
+        save_array(table, Path(self.config.lookup_table))
+        save_json(
+            path=Path(self.config.lookup_table_meta),
+            data={
+                "model_version": get_file_hash(Path(self.config.model))[:12],
+                "size": DOMAIN_SIZE,
+                "feature_names": feature_names,
+                "fields": {
+                    field: list(values) for field, values in INPUT_DOMAIN.items()
+                },
+            },
+        )
+        logger.info(
+            f"Compiled the model over {DOMAIN_SIZE} inputs into - {self.config.lookup_table}"
+        )
@@ -2,19 +2,216 @@ from abc import ABC, abstractmethod
 from pathlib import Path
 
 import mlflow
-import pandas as pd
+import numpy as np
 from dotenv import load_dotenv
-from sklearn.metrics import (accuracy_score, f1_score, precision_score,
-                             recall_score)
 
 from MushroomClassification import logger
 from MushroomClassification.entity.config_entity import ModelEvaluationConfig
-from MushroomClassification.utils.common import load_bin, save_json
+from MushroomClassification.utils.common import (iter_dataframe, load_bin,
+                                                 load_dataframe, save_json)
+from MushroomClassification.utils.profiler import profile_section
+
+
+def _ratio(numerator, denominator):
+    """Ratio that is 0.0 when the denominator is 0, like sklearn with zero_division=0."""
+    return float(numerator / denominator) if denominator else 0.0
+
+
+class MetricsAccumulator:
+    def __init__(self, n_bins=1000):
+        """
+        Accumulates everything needed to evaluate a binary classifier in one pass.
+
+        Every chunk of predictions is reduced with ``numpy.bincount`` to the 2x2
+        confusion matrix and to histograms of the positive-class scores of each class,
+        so the test set can be evaluated chunk by chunk in bounded memory. All metrics,
+        per-class stats and ROC / precision-recall curve points are derived from those
+        counts afterwards.
+
+        Parameters
+        ----------
+        n_bins : int
+            Number of equal-width score bins over [0, 1], i.e. the resolution of the curves.
+        """
+        self.n_bins = n_bins
+        self.confusion = np.zeros((2, 2), dtype=np.int64)
+        self.score_counts = np.zeros((2, n_bins), dtype=np.int64)
+
+    def update(self, y_true, y_pred, y_score=None):
+        """
+        Add a chunk of predictions.
+
+        Parameters
+        ----------
+        y_true : array-like
+            True 0/1 labels.
+        y_pred : array-like
+            Predicted 0/1 labels.
+        y_score : array-like, optional
+            Predicted probability of the positive class, needed for the curves.
+        """
+        y_true = np.asarray(y_true, dtype=np.int64)
+        y_pred = np.asarray(y_pred, dtype=np.int64)
+
+        counts = np.bincount(2 * y_true + y_pred, minlength=4)
+        if len(counts) > 4 or (len(y_true) and min(y_true.min(), y_pred.min()) < 0):
+            raise ValueError("Expected binary labels encoded as 0 and 1")
+        self.confusion += counts.reshape(2, 2)
+
+        if y_score is not None:
+            bins = np.clip(
+                (np.asarray(y_score) * self.n_bins).astype(np.int64),
+                0,
+                self.n_bins - 1,
+            )
+            self.score_counts += np.bincount(
+                y_true * self.n_bins + bins, minlength=2 * self.n_bins
+            ).reshape(2, self.n_bins)
+
+    @property
+    def n_samples(self):
+        return int(self.confusion.sum())
+
+    def metrics(self):
+        """
+        Accuracy, precision, recall and F1 score of the positive class.
+
+        Returns
+        -------
+        metrics : dict
+        """
+        (tn, fp), (fn, tp) = self.confusion
+        precision = _ratio(tp, tp + fp)
+        recall = _ratio(tp, tp + fn)
+        return {
+            "accuracy": _ratio(tp + tn, self.n_samples),
+            "precision": precision,
+            "recall": recall,
+            "f1_score": _ratio(2 * tp, 2 * tp + fp + fn),
+        }
+
+    def per_class(self):
+        """
+        Precision, recall, F1 score and support of every class.
+
+        Returns
+        -------
+        stats : dict
+            Stats keyed by class label.
+        """
+        stats = {}
+        for label in (0, 1):
+            tp = self.confusion[label, label]
+            predicted = self.confusion[:, label].sum()
+            support = self.confusion[label].sum()
+            stats[str(label)] = {
+                "precision": _ratio(tp, predicted),
+                "recall": _ratio(tp, support),
+                "f1_score": _ratio(2 * tp, predicted + support),
+                "support": int(support),
+            }
+        return stats
+
+    def _cumulative_counts(self):
+        """True and false positives when thresholding at every bin edge, highest first."""
+        negatives, positives = self.score_counts[:, ::-1]
+        tps = np.concatenate([[0], np.cumsum(positives)])
+        fps = np.concatenate([[0], np.cumsum(negatives)])
+        thresholds = np.arange(self.n_bins, -1, -1) / self.n_bins
+        return tps, fps, thresholds
+
+    def roc_curve(self):
+        """
+        ROC curve points and the area under the curve.
+
+        Returns
+        -------
+        curve : dict
+            False positive rates, true positive rates, thresholds and AUC.
+        """
+        tps, fps, thresholds = self._cumulative_counts()
+        fpr = fps / fps[-1] if fps[-1] else np.zeros(len(fps))
+        tpr = tps / tps[-1] if tps[-1] else np.zeros(len(tps))
+        return {
+            "fpr": fpr.tolist(),
+            "tpr": tpr.tolist(),
+            "thresholds": thresholds.tolist(),
+            "auc": float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)),
+        }
+
+    def pr_curve(self):
+        """
+        Precision-recall curve points and the average precision.
+
+        Returns
+        -------
+        curve : dict
+            Precisions, recalls, thresholds and average precision.
+        """
+        tps, fps, thresholds = self._cumulative_counts()
+        predicted = tps + fps
+        # thresholds above every score predict nothing positive, where precision is 1
+        precision = np.divide(
+            tps, predicted, out=np.ones(len(tps)), where=predicted > 0
+        )
+        recall = tps / tps[-1] if tps[-1] else np.zeros(len(tps))
+        return {
+            "precision": precision.tolist(),
+            "recall": recall.tolist(),
+            "thresholds": thresholds.tolist(),
+            "average_precision": float(np.sum(np.diff(recall) * precision[1:])),
+        }
+
+    def report(self):
+        """
+        Everything the accumulator knows, for the evaluation report.
+
+        Returns
+        -------
+        report : dict
+        """
+        report = {
+            "n_samples": self.n_samples,
+            "metrics": self.metrics(),
+            "confusion_matrix": self.confusion.tolist(),
+            "per_class": self.per_class(),
+        }
+        if self.score_counts.any():
+            report["roc_curve"] = self.roc_curve()
+            report["pr_curve"] = self.pr_curve()
+        return report
+
+
+def score_chunks(model, chunks):
+    """
+    Predict every chunk of the test data and accumulate the results.
+
+    Parameters
+    ----------
+    model : object
+        Trained model.
+    chunks : iterable of tuple
+        Features and target of every chunk of the test dataset.
+
+    Returns
+    -------
+    accumulator : MetricsAccumulator
+    """
+    accumulator = MetricsAccumulator()
+    for X, y in chunks:
+        if hasattr(model, "predict_proba"):
+            # a single pass over the model gives both the labels and the scores
+            proba = model.predict_proba(X)
+            y_pred = model.classes_.take(proba.argmax(axis=1))
+            accumulator.update(y, y_pred, proba[:, -1])
+        else:
+            accumulator.update(y, model.predict(X))
+    return accumulator
 
 
 class ModelEvaluationStrategy(ABC):
     @abstractmethod
-    def evaluate(self, model, X_test, y_test, config):
+    def evaluate(self, model, chunks, config):
         """
         Abstract method to evaluate the model using the given test data and configuration.
 
@@ -22,10 +219,8 @@ class ModelEvaluationStrategy(ABC):
         ----------
         model : object
             Trained model.
-        X_test : DataFrame
-            Features of the test dataset.
-        y_test : Series
-            Target of the test dataset.
+        chunks : iterable of tuple
+            Features and target of every chunk of the test dataset.
         config : ModelEvaluationConfig
             Configuration for the Model Evaluation stage.
         """
@@ -33,7 +228,7 @@ class ModelEvaluationStrategy(ABC):
 
 
 class EvaluationWithoutMLflowLogging(ModelEvaluationStrategy):
-    def evaluate(self, model, X_test, y_test, config):
+    def evaluate(self, model, chunks, config):
         """
         Evaluate the model using the given test data and configuration.
 
@@ -41,10 +236,8 @@ class EvaluationWithoutMLflowLogging(ModelEvaluationStrategy):
         ----------
         model : object
             Trained model.
-        X_test : DataFrame
-            Features of the test dataset.
-        y_test : Series
-            Target of the test dataset.
+        chunks : iterable of tuple
+            Features and target of every chunk of the test dataset.
         config : ModelEvaluationConfig
             Configuration for the Model Evaluation stage.
 
@@ -52,23 +245,19 @@ class EvaluationWithoutMLflowLogging(ModelEvaluationStrategy):
         -----
         This method does not use MLflow for logging and tracking.
         """
-        y_pred_test = model.predict(X_test)
+        accumulator = score_chunks(model, chunks)
 
         # Calculate test set metrics
-        test_metrics = {
-            "accuracy": accuracy_score(y_test, y_pred_test),
-            "precision": precision_score(y_test, y_pred_test),
-            "recall": recall_score(y_test, y_pred_test),
-            "f1_score": f1_score(y_test, y_pred_test),
-        }
+        test_metrics = accumulator.metrics()
 
-        # Save metrics to a JSON file
+        # Save metrics and the full report to JSON files
         save_json(data=test_metrics, path=Path(config.scores))
+        save_json(data=accumulator.report(), path=Path(config.report))
         logger.info(f"Model Evaluated. Test dataset scores: {test_metrics}")
 
 
 class EvaluationWithMLflowLogging(ModelEvaluationStrategy):
-    def evaluate(self, model, X_test, y_test, config):
+    def evaluate(self, model, chunks, config):
         """
         Evaluate the model using the given test data and configuration.
 
@@ -76,10 +265,8 @@ class EvaluationWithMLflowLogging(ModelEvaluationStrategy):
         ----------
         model : object
             Trained model.
-        X_test : DataFrame
-            Features of the test dataset.
-        y_test : Series
-            Target of the test dataset.
+        chunks : iterable of tuple
+            Features and target of every chunk of the test dataset.
         config : ModelEvaluationConfig
             Configuration for the Model Evaluation stage.
 
@@ -89,21 +276,25 @@ class EvaluationWithMLflowLogging(ModelEvaluationStrategy):
         """
         mlflow.set_tracking_uri(config.mlflow_tracking_uri)
         with mlflow.start_run():
-            y_pred_test = model.predict(X_test)
+            accumulator = score_chunks(model, chunks)
 
             # Calculate test set metrics
-            test_metrics = {
-                "accuracy": accuracy_score(y_test, y_pred_test),
-                "precision": precision_score(y_test, y_pred_test),
-                "recall": recall_score(y_test, y_pred_test),
-                "f1_score": f1_score(y_test, y_pred_test),
-            }
+            test_metrics = accumulator.metrics()
+            report = accumulator.report()
 
             # Log metrics to mlflow
             mlflow.log_metrics(test_metrics)
+            if "roc_curve" in report:
+                mlflow.log_metrics(
+                    {
+                        "roc_auc": report["roc_curve"]["auc"],
+                        "average_precision": report["pr_curve"]["average_precision"],
+                    }
+                )
 
-            # Save metrics to a JSON file
+            # Save metrics and the full report to JSON files
             save_json(data=test_metrics, path=Path(config.scores))
+            save_json(data=report, path=Path(config.report))
             logger.info(f"Model Evaluated. Test dataset scores: {test_metrics}")
 
 
@@ -126,8 +317,6 @@ class ModelEvaluation:
             Configuration for the Model Evaluation stage.
         evaluation_strategy : EvaluationStrategy
             Evaluation strategy to use for the model evaluation.
-        df : DataFrame
-            The test dataset.
         model : object
             The trained model.
         """
@@ -138,17 +327,40 @@ class ModelEvaluation:
             else EvaluationWithoutMLflowLogging()
         )
 
-        # Load the test data and the model
-        self.df = pd.read_csv(self.config.test_data)
+        # Load the model, the test data is read when evaluating
         self.model = load_bin(Path(self.config.model))
-        logger.info("Loaded test data and model")
+        logger.info("Loaded model")
+
+    def test_chunks(self):
+        """
+        Yield the features and target of the test dataset, in chunks of
+        ``config.chunksize`` rows or all at once when it is 0. The rows read so far
+        are counted in ``test_rows``.
+        """
+        self.test_rows = 0
+        path = Path(self.config.test_data)
+        if self.config.chunksize:
+            chunks = iter_dataframe(path, self.config.chunksize)
+        else:
+            chunks = [load_dataframe(path, memory_map=True)]
+
+        # the model may have been trained on a subset of the features, see model tuning
+        columns = getattr(self.model, "feature_names_in_", None)
+        for df in chunks:
+            X_test, y_test = df.drop("class", axis=1), df["class"]
+            if columns is not None:
+                X_test = X_test[list(columns)]
+            self.test_rows += len(df)
+            yield X_test, y_test
 
     def evaluate(self):
         """
         Evaluate the model using the given test data and configuration.
 
         """
-        X_test, y_test = self.df.drop("class", axis=1), self.df["class"]
-
         # Delegate evaluation to the strategy
-        self.evaluation_strategy.evaluate(self.model, X_test, y_test, self.config)
+        with profile_section("evaluate") as section:
+            self.evaluation_strategy.evaluate(
+                self.model, self.test_chunks(), self.config
+            )
+            section["rows"] = self.test_rows
@@ -1,19 +1,168 @@
+import os
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
 from pathlib import Path
 
 import mlflow
 import mlflow.sklearn
-import pandas as pd
+import numpy as np
+from box import ConfigBox
 from dotenv import load_dotenv
-from sklearn.model_selection import train_test_split
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import (ParameterGrid, ParameterSampler,
+                                     StratifiedKFold, train_test_split)
 from sklearn.tree import DecisionTreeClassifier
 
 from MushroomClassification import logger
+from MushroomClassification.components.data_transformation import select_top_k
 from MushroomClassification.entity.config_entity import ModelTrainingConfig
-from MushroomClassification.utils.common import save_bin
+from MushroomClassification.utils.common import (get_file_hash, load_dataframe,
+                                                 save_array, save_bin,
+                                                 save_dataframe, save_json)
+from MushroomClassification.utils.feature_scoring import FeatureScorer
+from MushroomClassification.utils.profiler import profile_section
 
 load_dotenv()
 
+# flat representation of a fitted decision tree, one record per node
+COMPILED_TREE_DTYPE = np.dtype(
+    [
+        ("feature", np.int32),
+        ("threshold", np.float64),
+        ("left", np.int32),
+        ("right", np.int32),
+        ("label", np.int64),
+    ]
+)
+
+
+def compile_tree(model) -> np.ndarray:
+    """
+    Compile a fitted DecisionTreeClassifier into a flat array of nodes.
+
+    Every node stores the feature and threshold it tests, its left and right children
+    and the predicted class label. Leaves point to themselves with an infinite threshold,
+    so a batch can be traversed for a fixed number of steps without masking.
+
+    Parameters
+    ----------
+    model : DecisionTreeClassifier
+        Fitted model.
+
+    Returns
+    -------
+    tree : ndarray
+        Structured array of COMPILED_TREE_DTYPE, node 0 being the root.
+    """
+    tree_ = model.tree_
+    nodes = np.arange(tree_.node_count)
+    is_leaf = tree_.children_left == -1
+
+    tree = np.empty(tree_.node_count, dtype=COMPILED_TREE_DTYPE)
+    tree["feature"] = np.where(is_leaf, 0, tree_.feature)
+    tree["threshold"] = np.where(is_leaf, np.inf, tree_.threshold)
+    tree["left"] = np.where(is_leaf, nodes, tree_.children_left)
+    tree["right"] = np.where(is_leaf, nodes, tree_.children_right)
+    tree["label"] = model.classes_[tree_.value[:, 0, :].argmax(axis=1)]
+    return tree
+
+
+def save_compiled_tree(model, config):
+    """
+    Compile the model with ``compile_tree`` and save it next to the model.
+
+    Parameters
+    ----------
+    model : DecisionTreeClassifier
+        Fitted model, already saved at ``config.model``.
+    config : ModelTrainingConfig
+        Configuration for the Model Training stage.
+    """
+    save_array(compile_tree(model), Path(config.compiled_model))
+    save_json(
+        path=Path(config.compiled_model_meta),
+        data={
+            "model_version": get_file_hash(Path(config.model))[:12],
+            "feature_names": list(model.feature_names_in_),
+            "depth": int(model.get_depth()),
+        },
+    )
+    logger.info(f"Compiled model saved at - {config.compiled_model}")
+
+
+def rank_features(X, y):
+    """
+    ANOVA F-values of binary features, computed from per-class counts with a
+    FeatureScorer.
+
+    Parameters
+    ----------
+    X : ndarray
+        0/1 features of shape (n_samples, n_features).
+    y : ndarray
+        0/1 class labels.
+
+    Returns
+    -------
+    scores : ndarray
+        F-value of every feature, as ``f_classif`` would compute it.
+    """
+    scores, _ = FeatureScorer("f_classif")(X, y)
+    return scores
+
+
+# training data and folds of a tuning worker process, set up once by the initializer
+_tuning_data = None
+_tuning_folds = None
+
+
+def _init_tuning_worker(path, cv, random_state):
+    """
+    Memory-map the training data shared by all workers and compute the folds.
+
+    The folds are deterministic, so every worker computes the same ones instead of
+    receiving them, and the features are ranked once per fold.
+    """
+    global _tuning_data, _tuning_folds
+    _tuning_data = np.load(path, mmap_mode="r")
+    X, y = _tuning_data[:, :-1], np.asarray(_tuning_data[:, -1])
+
+    _tuning_folds = []
+    folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    for train_idx, test_idx in folds.split(np.zeros(len(y)), y):
+        scores = rank_features(X[train_idx], y[train_idx])
+        _tuning_folds.append((train_idx, test_idx, scores))
+
+
+def _score_candidate(candidate):
+    """
+    Cross-validate a candidate in a tuning worker.
+
+    Parameters
+    ----------
+    candidate : tuple
+        Index of the candidate, the DecisionTreeClassifier params and k.
+
+    Returns
+    -------
+    result : tuple
+        Index of the candidate, mean score and mean number of tree nodes over the folds.
+    """
+    index, params, k, scoring = candidate
+    X, y = _tuning_data[:, :-1], np.asarray(_tuning_data[:, -1])
+    scorer = get_scorer(scoring)
+
+    scores, node_counts = [], []
+    for train_idx, test_idx, feature_scores in _tuning_folds:
+        columns = np.flatnonzero(select_top_k(feature_scores, k))
+        model = DecisionTreeClassifier(**params)
+        model.fit(X[np.ix_(train_idx, columns)], y[train_idx])
+        scores.append(scorer(model, X[np.ix_(test_idx, columns)], y[test_idx]))
+        node_counts.append(model.tree_.node_count)
+    return index, float(np.mean(scores)), float(np.mean(node_counts))
+
 
 class TrainingStrategy(ABC):
     @abstractmethod
@@ -74,6 +223,7 @@ class TrainWithMLflowStrategy(TrainingStrategy):
             # Save the model using MLflow
             mlflow.sklearn.log_model(model, "model")
             save_bin(model, Path(config.model))
+            save_compiled_tree(model, config)
 
             logger.info(f"Model trained and saved with MLflow at - {config.model}")
 
@@ -97,12 +247,167 @@ class TrainWithoutMLflowStrategy(TrainingStrategy):
         This method does not use MLflow for logging and tracking.
         """
         model = DecisionTreeClassifier(**config.model_params)
-        model.fit(X_train, y_train)
-        save_bin(model, Path(config.model))
+        with profile_section("fit", len(X_train)):
+            model.fit(X_train, y_train)
+        with profile_section("save"):
+            save_bin(model, Path(config.model))
+            save_compiled_tree(model, config)
 
         logger.info(f"Model trained and saved at - {config.model}")
 
 
+class TrainWithTuningStrategy(TrainingStrategy):
+    def __init__(self, training_strategy):
+        """
+        Initializes the tuning strategy.
+
+        Parameters
+        ----------
+        training_strategy : TrainingStrategy
+            Strategy training the final model with the winning params.
+        """
+        self.training_strategy = training_strategy
+
+    @staticmethod
+    def candidates(tuning):
+        """
+        Parameter combinations to search, every one a dict of tree params and ``k``.
+
+        Parameters
+        ----------
+        tuning : ConfigBox
+            The ``model_tuning`` params.
+
+        Returns
+        -------
+        candidates : list of dict
+        """
+        param_grid = {key: list(values) for key, values in tuning.param_grid.items()}
+        if tuning.search == "grid":
+            return list(ParameterGrid(param_grid))
+        if tuning.search == "random":
+            n_iter = min(tuning.n_iter, len(ParameterGrid(param_grid)))
+            return list(
+                ParameterSampler(
+                    param_grid, n_iter=n_iter, random_state=tuning.random_state
+                )
+            )
+        raise ValueError(f"Unknown search {tuning.search!r}, expected grid or random")
+
+    def search(self, X_train, y_train, config):
+        """
+        Cross-validate every candidate across a pool of worker processes.
+
+        The training data is saved once as a ``.npy`` file that every worker memory-maps
+        read-only, so only the candidate params travel between processes. Within each
+        fold the features are ranked by their ANOVA F-value on the training part and the
+        top ``k`` are kept, like SelectKBest in a pipeline would.
+
+        Parameters
+        ----------
+        X_train : DataFrame
+            Features of the training dataset.
+        y_train : Series
+            Target of the training dataset.
+        config : ModelTrainingConfig
+            Configuration for the Model Training stage.
+
+        Returns
+        -------
+        results : list of dict
+            Every candidate with its mean score and tree size, best first.
+        """
+        tuning = config.model_tuning
+        n_features = X_train.shape[1]
+        np.save(
+            config.tuning_data,
+            np.column_stack([X_train.to_numpy(), y_train.to_numpy()]).astype(np.uint8),
+        )
+
+        candidates = []
+        for index, candidate in enumerate(self.candidates(tuning)):
+            candidate = dict(candidate)
+            k = min(candidate.pop("k", n_features), n_features)
+            params = {
+                "random_state": tuning.random_state,
+                **config.model_params,
+                **candidate,
+            }
+            candidates.append((index, params, k, tuning.scoring))
+
+        n_jobs = tuning.n_jobs if tuning.n_jobs > 0 else os.cpu_count()
+        logger.info(
+            f"Searching {len(candidates)} candidates with {tuning.cv}-fold "
+            f"cross-validation on {n_jobs} processes"
+        )
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_tuning_worker,
+            initargs=(config.tuning_data, tuning.cv, tuning.random_state),
+        ) as pool:
+            scores = list(
+                pool.map(
+                    _score_candidate,
+                    candidates,
+                    chunksize=max(1, len(candidates) // (4 * n_jobs)),
+                )
+            )
+
+        results = [
+            {"model_params": params, "k": k, "score": score, "node_count": nodes}
+            for (_, params, k, _), (_, score, nodes) in zip(candidates, scores)
+        ]
+        # best score first, ties going to fewer features and smaller trees
+        results.sort(key=lambda r: (-r["score"], r["k"], r["node_count"]))
+        return results
+
+    def train_model(self, X_train, y_train, config):
+        """
+        Search the best params, then train the model with them on the top k features.
+
+        Parameters
+        ----------
+        X_train : DataFrame
+            Features of the training dataset.
+        y_train : Series
+            Target of the training dataset.
+        config : ModelTrainingConfig
+            Configuration for the Model Training stage.
+
+        Notes
+        -----
+        The winning params are saved at ``config.best_params`` and handed to the
+        wrapped strategy in place of the ``model_params`` of ``params.yaml``.
+        """
+        start = time.perf_counter()
+        with profile_section("tuning_search", len(X_train)):
+            results = self.search(X_train, y_train, config)
+        best = results[0]
+
+        scores = rank_features(X_train.to_numpy(), y_train.to_numpy())
+        selected = list(X_train.columns[select_top_k(scores, best["k"])])
+        save_json(
+            path=Path(config.best_params),
+            data={
+                "model_params": best["model_params"],
+                "k": best["k"],
+                "selected_features": selected,
+                "scoring": config.model_tuning.scoring,
+                "cv_score": best["score"],
+                "candidates": len(results),
+                "duration": time.perf_counter() - start,
+                "top_candidates": results[:10],
+            },
+        )
+        logger.info(
+            f"Best params with a {config.model_tuning.scoring} of {best['score']:.4f}: "
+            f"{best['model_params']}, k={best['k']}"
+        )
+
+        tuned_config = replace(config, model_params=ConfigBox(best["model_params"]))
+        self.training_strategy.train_model(X_train[selected], y_train, tuned_config)
+
+
 class ModelTraining:
     def __init__(self, config: ModelTrainingConfig, enable_mlflow_logging: bool):
         """
@@ -122,29 +427,36 @@ class ModelTraining:
             if enable_mlflow_logging
             else TrainWithoutMLflowStrategy()
         )
+        if self.config.model_tuning.enabled:
+            self.strategy = TrainWithTuningStrategy(self.strategy)
 
         # load transformed data
-        self.df = pd.read_csv(self.config.transformed_data)
+        self.df = load_dataframe(Path(self.config.transformed_data), memory_map=True)
         logger.info("Loaded transformed data")
 
     def data_splits(self):
 
         df_transformed = self.df
-        # Split data into train and test datasets
-        train_df, test_df = train_test_split(
-            df_transformed,
-            test_size=0.2,
-            random_state=42,
-            stratify=df_transformed["class"],
-        )
+        with profile_section("data_splits", len(df_transformed)):
+            # Split data into train and test datasets
+            train_df, test_df = train_test_split(
+                df_transformed,
+                test_size=0.2,
+                random_state=42,
+                stratify=df_transformed["class"],
+            )
 
-        # split train df to X and y
-        self.X_train, self.y_train = train_df.drop("class", axis=1), train_df["class"]
-        logger.info("Splitted the loaded data into X_train, y_train, and test_df")
+            # split train df to X and y
+            self.X_train, self.y_train = (
+                train_df.drop("class", axis=1),
+                train_df["class"],
+            )
+            logger.info("Splitted the loaded data into X_train, y_train, and test_df")
 
-        test_df.to_csv(self.config.test_data, index=False)
-        logger.info(f"Saved the test dataset to - {self.config.test_data}")
+            save_dataframe(test_df, Path(self.config.test_data))
+            logger.info(f"Saved the test dataset to - {self.config.test_data}")
 
     def train_model(self):
         # Use the strategy to train the model
-        self.strategy.train_model(self.X_train, self.y_train, self.config)
+        with profile_section("train_model", len(self.X_train)):
+            self.strategy.train_model(self.X_train, self.y_train, self.config)
@@ -2,8 +2,9 @@ from pathlib import Path
 
 from MushroomClassification.constants import CONFIG_FILE_PATH, PARAMS_FILE_PATH
 from MushroomClassification.entity.config_entity import (
-    DataIngestionConfig, DataTransformationConfig, ModelEvaluationConfig,
-    ModelTrainingConfig)
+    DataIngestionConfig, DataTransformationConfig, ModelCompilationConfig,
+    ModelEvaluationConfig, ModelTrainingConfig, PredictionConfig,
+    ProfilingConfig, StageCacheConfig, TrainingJobConfig)
 from MushroomClassification.utils.common import create_directories, read_yaml
 
 
@@ -20,15 +21,33 @@ class ConfigurationManager:
             source_url=config.source_url,
             file_path=config.file_path,
             unzip_dir=config.unzip_dir,
+            sha256=config.sha256,
+            download_segments=config.download_segments,
+            extract_mode=config.extract_mode,
+            extract_manifest=config.extract_manifest,
         )
 
     def get_data_transformation_config(self) -> DataTransformationConfig:
         config = self.config.data_transformation
         create_directories([Path(config.root_dir)])
+
+        # the CSV is streamed out of the downloaded archive when it is not extracted
+        data_ingestion = self.config.data_ingestion
+        archive_path = (
+            data_ingestion.file_path if data_ingestion.extract_mode == "none" else None
+        )
         return DataTransformationConfig(
             root_dir=config.root_dir,
             data_path=config.data_path,
+            archive_path=archive_path,
             transformed_data=config.transformed_data,
+            encoder=config.encoder,
+            profile=config.profile,
+            encoding=self.params.data_transformation.encoding,
+            feature_scoring=self.params.data_transformation.feature_scoring,
+            eda=self.params.data_transformation.eda,
+            eda_sample_size=self.params.data_transformation.eda_sample_size,
+            chunksize=self.params.data_transformation.chunksize,
         )
 
     def get_model_training_config(self) -> ModelTrainingConfig:
@@ -37,9 +56,14 @@ class ConfigurationManager:
         return ModelTrainingConfig(
             root_dir=config.root_dir,
             model=config.model,
+            compiled_model=config.compiled_model,
+            compiled_model_meta=config.compiled_model_meta,
             transformed_data=config.transformed_data,
             model_params=self.params.model_params,
             test_data=config.test_data,
+            tuning_data=config.tuning_data,
+            best_params=config.best_params,
+            model_tuning=self.params.model_tuning,
             mlflow_tracking_uri=config.mlflow_tracking_uri,
         )
 
@@ -51,5 +75,61 @@ class ConfigurationManager:
             model=config.model,
             test_data=config.test_data,
             scores=config.scores,
+            report=config.report,
+            chunksize=self.params.model_evaluation.chunksize,
             mlflow_tracking_uri=config.mlflow_tracking_uri,
         )
+
+    def get_model_compilation_config(self) -> ModelCompilationConfig:
+        config = self.config.model_compilation
+        create_directories([Path(config.root_dir)])
+        return ModelCompilationConfig(
+            root_dir=config.root_dir,
+            model=config.model,
+            lookup_table=config.lookup_table,
+            lookup_table_meta=config.lookup_table_meta,
+        )
+
+    def get_training_job_config(self) -> TrainingJobConfig:
+        config = self.config.training_jobs
+        create_directories([Path(config.root_dir)])
+        return TrainingJobConfig(
+            root_dir=config.root_dir,
+            command=config.command,
+            max_log_lines=config.max_log_lines,
+        )
+
+    def get_stage_cache_config(self) -> StageCacheConfig:
+        config = self.config.stage_cache
+        create_directories([Path(config.root_dir)])
+        return StageCacheConfig(
+            root_dir=config.root_dir,
+            enabled=config.enabled,
+        )
+
+    def get_profiling_config(self) -> ProfilingConfig:
+        config = self.config.profiling
+        create_directories([Path(config.root_dir)])
+        return ProfilingConfig(
+            root_dir=config.root_dir,
+            enabled=config.enabled,
+            sample_interval_ms=config.sample_interval_ms,
+            dump=config.dump,
+        )
+
+    def get_prediction_config(self) -> PredictionConfig:
+        config = self.config.prediction
+        return PredictionConfig(
+            model=config.model,
+            compiled_model=config.compiled_model,
+            compiled_model_meta=config.compiled_model_meta,
+            encoder=config.encoder,
+            lookup_table=config.lookup_table,
+            lookup_table_meta=config.lookup_table_meta,
+            mlflow_model_uri=config.mlflow_model_uri,
+            reload_interval=config.reload_interval,
+            batch_max_size=config.batch_max_size,
+            batch_max_wait_ms=config.batch_max_wait_ms,
+            cache_size=config.cache_size,
+            mmap=config.mmap,
+        )
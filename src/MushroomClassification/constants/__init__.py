@@ -2,3 +2,17 @@ from pathlib import Path
 
 CONFIG_FILE_PATH = Path("config/config.yaml")
 PARAMS_FILE_PATH = Path("params.yaml")
+
+# values accepted for every field of the prediction input, in a fixed order
+INPUT_DOMAIN = {
+    "bruises": ("t", "f"),
+    "odor": ("f", "n", "o"),
+    "gill_spacing": ("w", "o"),
+    "gill_size": ("b", "n"),
+    "gill_color": ("b", "o"),
+    "stalk_surface_above_ring": ("k", "s", "o"),
+    "stalk_surface_below_ring": ("k", "s", "o"),
+    "ring_type": ("l", "p", "o"),
+    "spore_print_color": ("h", "k", "n", "w", "o"),
+    "population": ("v", "o"),
+}
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 from box import ConfigBox
 
@@ -10,22 +11,39 @@ class DataIngestionConfig:
     source_url: str
     file_path: Path
     unzip_dir: Path
+    sha256: str
+    download_segments: int
+    extract_mode: str
+    extract_manifest: Path
 
 
 @dataclass(frozen=True)
 class DataTransformationConfig:
     root_dir: Path
     data_path: Path
+    archive_path: Optional[Path]
     transformed_data: Path
+    encoder: Path
+    profile: Path
+    encoding: str
+    feature_scoring: str
+    eda: str
+    eda_sample_size: int
+    chunksize: int
 
 
 @dataclass(frozen=True)
 class ModelTrainingConfig:
     root_dir: Path
     model: Path
+    compiled_model: Path
+    compiled_model_meta: Path
     transformed_data: Path
     model_params: ConfigBox
     test_data: Path
+    tuning_data: Path
+    best_params: Path
+    model_tuning: ConfigBox
     mlflow_tracking_uri: str
 
 
@@ -35,4 +53,51 @@ class ModelEvaluationConfig:
     model: Path
     test_data: Path
     scores: Path
+    report: Path
+    chunksize: int
     mlflow_tracking_uri: str
+
+
+@dataclass(frozen=True)
+class ModelCompilationConfig:
+    root_dir: Path
+    model: Path
+    lookup_table: Path
+    lookup_table_meta: Path
+
+
+@dataclass(frozen=True)
+class TrainingJobConfig:
+    root_dir: Path
+    command: str
+    max_log_lines: int
+
+
+@dataclass(frozen=True)
+class StageCacheConfig:
+    root_dir: Path
+    enabled: bool
+
+
+@dataclass(frozen=True)
+class ProfilingConfig:
+    root_dir: Path
+    enabled: bool
+    sample_interval_ms: float
+    dump: str
+
+
+@dataclass(frozen=True)
+class PredictionConfig:
+    model: Path
+    compiled_model: Path
+    compiled_model_meta: Path
+    encoder: Path
+    lookup_table: Path
+    lookup_table_meta: Path
+    mlflow_model_uri: str
+    reload_interval: float
+    batch_max_size: int
+    batch_max_wait_ms: float
+    cache_size: int
+    mmap: bool
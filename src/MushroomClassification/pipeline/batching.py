@@ -0,0 +1,131 @@
+import asyncio
+from typing import Any, Callable, List, Optional
+
+from MushroomClassification import logger
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        score_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+    ):
+        """
+        Groups concurrent requests into batches scored in a worker thread.
+
+        Items submitted while a batch is being collected or scored are queued. A batch is
+        closed as soon as no other item is waiting, when it holds ``max_batch_size`` items
+        or ``max_wait_ms`` milliseconds after its first item arrived, then scored with a
+        single ``score_batch`` call off the event loop. Every caller gets back the result
+        of its own item, or has the exception returned in its place raised.
+
+        :param score_batch: function returning one result per item of the batch, or an
+            exception instance for an item that could not be scored
+        :param max_batch_size: maximum number of items scored together
+        :param max_wait_ms: maximum time the first item of a batch waits for others while
+            they keep arriving
+        """
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # metrics
+        self.batches = 0
+        self.items = 0
+        self.last_batch_size = 0
+        self.largest_batch_size = 0
+
+    async def start(self):
+        """Start the worker collecting and scoring batches on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker, items still queued are scored first."""
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+
+    async def submit(self, item):
+        """Queue an item and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        """Wait for a first item, then gather the waiting ones until the batch is full or the window closes."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size and loop.time() < deadline:
+            if self._queue.empty():
+                # let the requests already running on the loop queue their items, then
+                # score the batch rather than hold it for the whole window
+                await asyncio.sleep(0)
+                if self._queue.empty():
+                    break
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.score_batch, items)
+                outcomes = [
+                    (None, result) if isinstance(result, Exception) else (result, None)
+                    for result in results
+                ]
+            except Exception as e:
+                logger.error(
+                    f"Error scoring a batch of {len(items)}, retrying one by one: {e}"
+                )
+                outcomes = [
+                    await loop.run_in_executor(None, self._score_one, item)
+                    for item in items
+                ]
+
+            for (_, future), (result, error) in zip(batch, outcomes):
+                if future.cancelled():
+                    pass
+                elif error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+                self._queue.task_done()
+
+            self.batches += 1
+            self.items += len(batch)
+            self.last_batch_size = len(batch)
+            self.largest_batch_size = max(self.largest_batch_size, len(batch))
+
+    def _score_one(self, item):
+        """Score a single item, returning (result, error)."""
+        try:
+            result = self.score_batch([item])[0]
+        except Exception as e:
+            return None, e
+        if isinstance(result, Exception):
+            return None, result
+        return result, None
+
+    def stats(self) -> dict:
+        """Current queue depth and batch size metrics."""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "last_batch_size": self.last_batch_size,
+            "largest_batch_size": self.largest_batch_size,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
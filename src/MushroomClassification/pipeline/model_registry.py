@@ -0,0 +1,359 @@
+import mmap
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Optional
+
+import numpy as np
+
+from MushroomClassification import logger
+from MushroomClassification.config.configuration import ConfigurationManager
+from MushroomClassification.entity.config_entity import PredictionConfig
+from MushroomClassification.utils.common import (get_file_hash, load_bin,
+                                                 load_json)
+from MushroomClassification.utils.input_encoding import (DOMAIN_SIZE,
+                                                         InputEncoder)
+from MushroomClassification.utils.metrics import REGISTRY
+
+MODEL_LOADS = REGISTRY.counter(
+    "model_loads_total", "Model loads by source and outcome", ("source", "outcome")
+)
+MODEL_LOAD_SECONDS = REGISTRY.histogram(
+    "model_load_duration_seconds", "Time spent loading a model", ("source",)
+)
+MODEL_INFO = REGISTRY.gauge(
+    "model_info", "Version and location of the resident model", ("version", "source")
+)
+
+
+def page_in(array: Optional[np.ndarray]):
+    """Read a byte of every page of a memory-mapped array, so that it is resident before serving."""
+    if isinstance(array, np.memmap):
+        np.frombuffer(array, dtype=np.uint8)[:: mmap.PAGESIZE].sum()
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """
+    A model resident in memory together with the metadata describing it.
+
+    :param model: the loaded model, anything exposing ``predict``
+    :param version: fingerprint of the model (sha256 prefix of the local file or the MLflow URI)
+    :param source: where the model was loaded from
+    :param loaded_at: unix timestamp of the load
+    :param lookup_table: answers of the model over the whole input domain, if compiled for this version
+    :param encoder: encoder fitted during training, if it was saved
+    :param compiled_tree: CompiledTreePredictor of the model, if it was compiled during training
+    """
+
+    model: Any
+    version: str
+    source: str
+    loaded_at: float
+    lookup_table: Optional[np.ndarray] = None
+    encoder: Optional[InputEncoder] = None
+    compiled_tree: Optional[Any] = None
+
+    @property
+    def memory_mapped(self) -> bool:
+        """Whether the compiled artifacts are memory-mapped rather than copied into the process."""
+        tree = self.compiled_tree.tree if self.compiled_tree is not None else None
+        return isinstance(self.lookup_table, np.memmap) or isinstance(tree, np.memmap)
+
+
+class LazyModel:
+    def __init__(self, path: Path):
+        """
+        A local model file loaded on first use.
+
+        Predictions answered from the lookup table or the compiled tree never touch the
+        model, so joblib and sklearn are only imported once a prediction falls back to it.
+
+        :param path: path to the joblib model file
+        """
+        self.path = path
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = load_bin(self.path)
+        return self._model
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+
+class ModelRegistry:
+    def __init__(self, config: PredictionConfig):
+        """
+        Keeps a single model resident for the whole process.
+
+        The model is loaded once (from MLflow when a model URI is configured, falling
+        back to the local joblib file) and served from memory afterwards, together with
+        the encoder fitted during training and the compiled tree and lookup table of the
+        model, if any. The local model file itself is only read once a prediction falls
+        back to it (see LazyModel), or at load when there is neither a compiled tree nor
+        a lookup table to answer from. With ``config.mmap`` the compiled tree and lookup
+        table are memory-mapped read-only rather than read into the process, so the
+        workers of a multi-process server share the page cache holding them. The local
+        files are polled at most every
+        ``config.reload_interval`` seconds and, when a new file lands, the model is
+        reloaded and swapped in atomically.
+
+        :param config: PredictionConfig object with the model locations
+        """
+        self.config = config
+        self._current: Optional[LoadedModel] = None
+        self._lock = threading.Lock()
+        self._file_stamp = None
+        self._last_check = 0.0
+
+    def _stat_model_file(self):
+        """
+        Return a cheap (mtime, size) signature of the local model file, the encoder and
+        the artifacts compiled from the model, or None if there is no local model.
+        """
+        stamps = []
+        for path in (
+            self.config.model,
+            self.config.encoder,
+            self.config.compiled_model_meta,
+            self.config.lookup_table_meta,
+        ):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stamps.append(None)
+            else:
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(stamps) if stamps[0] is not None else None
+
+    @property
+    def _mmap_mode(self) -> Optional[str]:
+        return "r" if self.config.mmap else None
+
+    def _load_lookup_table(self, version: str):
+        """
+        Load the compiled lookup table if it was compiled from the given model version.
+
+        :return: the lookup table and the feature names of the model, None when the table
+            was compiled before they were recorded, or (None, None)
+        """
+        try:
+            meta = load_json(Path(self.config.lookup_table_meta))
+            if meta.model_version != version or meta.size != DOMAIN_SIZE:
+                logger.info("Lookup table is stale, predicting with the model")
+                return None, None
+            table = np.load(self.config.lookup_table, mmap_mode=self._mmap_mode)
+            feature_names = meta.get("feature_names")
+            return table, list(feature_names) if feature_names is not None else None
+        except Exception as e:
+            logger.info(f"No lookup table available, predicting with the model: {e}")
+            return None, None
+
+    def _load_compiled_tree(self, version: str):
+        """
+        Load the compiled tree if it was compiled from the given model version.
+
+        :return: the CompiledTreePredictor and the feature names of the model, or (None, None)
+        """
+        # imported here as the prediction module depends on the registry
+        from MushroomClassification.pipeline.prediction import \
+            CompiledTreePredictor
+
+        try:
+            meta = load_json(Path(self.config.compiled_model_meta))
+            if meta.model_version != version:
+                logger.info("Compiled tree is stale, predicting with the model")
+                return None, None
+            tree = CompiledTreePredictor.load(
+                self.config.compiled_model, mmap_mode=self._mmap_mode
+            )
+            return tree, list(meta.feature_names)
+        except Exception as e:
+            logger.info(f"No compiled tree available, predicting with the model: {e}")
+            return None, None
+
+    def _load_encoder(
+        self, feature_names: Optional[List[str]]
+    ) -> Optional[InputEncoder]:
+        """Load the encoder saved by the data transformation stage, matched to the model's features."""
+        try:
+            encoder = InputEncoder.from_artifact(load_json(Path(self.config.encoder)))
+        except Exception as e:
+            logger.info(f"No fitted encoder available, using the default features: {e}")
+            return None
+
+        if feature_names is not None and list(feature_names) != encoder.feature_names:
+            logger.info(
+                "Encoder features differ from the model's, matching them by name"
+            )
+            return InputEncoder(list(feature_names))
+        return encoder
+
+    def _load_local(self) -> LoadedModel:
+        path = Path(self.config.model)
+        model = LazyModel(path)
+        version = get_file_hash(path)[:12]
+        lookup_table, table_features = self._load_lookup_table(version)
+        compiled_tree, feature_names = self._load_compiled_tree(version)
+        # the feature names of the model are recorded with the artifacts compiled from
+        # it, without them the encoder's are used as they are, so the model file is
+        # not read for them
+        encoder = self._load_encoder(feature_names or table_features)
+        if lookup_table is None and compiled_tree is None:
+            # every prediction falls back to the model, load it before serving any
+            model.load()
+        page_in(lookup_table)
+        if compiled_tree is not None:
+            page_in(compiled_tree.tree)
+        return LoadedModel(
+            model, version, str(path), time.time(), lookup_table, encoder, compiled_tree
+        )
+
+    def _load_mlflow(self) -> LoadedModel:
+        # mlflow is heavy to import and only needed when a model URI is configured
+        import mlflow
+
+        uri = self.config.mlflow_model_uri
+        model = mlflow.pyfunc.load_model(uri)
+        logger.warning(
+            f"Serving the MLflow model {uri} without the lookup table and compiled "
+            "tree of the local model, clear prediction.mlflow_model_uri to use them"
+        )
+        encoder = self._load_encoder(getattr(model, "feature_names_in_", None))
+        return LoadedModel(model, uri, uri, time.time(), encoder=encoder)
+
+    def _load_from(self, source: str) -> LoadedModel:
+        """Load the model from "mlflow" or "local", counting the loads by outcome."""
+        start = time.perf_counter()
+        try:
+            loaded = self._load_mlflow() if source == "mlflow" else self._load_local()
+        except Exception:
+            MODEL_LOADS.inc(source=source, outcome="error")
+            raise
+        MODEL_LOADS.inc(source=source, outcome="ok")
+        MODEL_LOAD_SECONDS.observe(time.perf_counter() - start, source=source)
+        return loaded
+
+    def _swap(self, loaded: LoadedModel, file_stamp) -> LoadedModel:
+        # a single attribute assignment, so readers see either the old or the new model
+        self._current = loaded
+        self._file_stamp = file_stamp
+        self._last_check = time.monotonic()
+        MODEL_INFO.clear()
+        MODEL_INFO.set(1, version=loaded.version, source=loaded.source)
+        logger.info(f"Model {loaded.version} loaded from {loaded.source}")
+        return loaded
+
+    def load(self) -> LoadedModel:
+        """
+        Load the model if no model is resident yet and return the resident model.
+
+        The MLflow model is tried first, the local model is used as a fallback.
+        """
+        with self._lock:
+            if self._current is not None:
+                return self._current
+
+            file_stamp = self._stat_model_file()
+            if self.config.mlflow_model_uri:
+                try:
+                    return self._swap(self._load_from("mlflow"), file_stamp)
+                except Exception as e:
+                    logger.error(f"Error loading MLflow model: {e}")
+
+            return self._swap(self._load_from("local"), file_stamp)
+
+    def _reload_local(self, file_stamp) -> bool:
+        """Swap in the local model, keeping the current one if loading fails. Caller holds the lock."""
+        try:
+            self._swap(self._load_from("local"), file_stamp)
+            return True
+        except Exception as e:
+            if self._current is None:
+                raise e
+            logger.error(f"Error reloading model, keeping the current one: {e}")
+            self._last_check = time.monotonic()
+            return False
+
+    def reload(self) -> LoadedModel:
+        """
+        Reload the model from the local file and swap it in.
+
+        The current model stays in place if the new one fails to load.
+        """
+        with self._lock:
+            self._reload_local(self._stat_model_file())
+            return self._current
+
+    def refresh(self) -> bool:
+        """
+        Reload the model if the local model file, the encoder or a compiled artifact changed since they were last seen.
+
+        :return: True if a new model was swapped in
+        """
+        self._last_check = time.monotonic()
+        file_stamp = self._stat_model_file()
+        if file_stamp is None or file_stamp == self._file_stamp:
+            return False
+
+        with self._lock:
+            # another thread may have swapped the model while we waited for the lock
+            file_stamp = self._stat_model_file()
+            if file_stamp is None or file_stamp == self._file_stamp:
+                return False
+            return self._reload_local(file_stamp)
+
+    def get(self) -> LoadedModel:
+        """Return the resident model, loading or hot-swapping it when needed."""
+        current = self._current
+        if current is None:
+            return self.load()
+
+        if time.monotonic() - self._last_check >= self.config.reload_interval:
+            self.refresh()
+        return self._current
+
+    @property
+    def version(self) -> Optional[str]:
+        current = self._current
+        return current.version if current is not None else None
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether a model is resident and predictions are answered without loading it, from
+        the lookup table, the compiled tree or a model already in memory.
+        """
+        current = self._current
+        if current is None:
+            return False
+        if current.lookup_table is not None or current.compiled_tree is not None:
+            return True
+        model = current.model
+        return model.loaded if isinstance(model, LazyModel) else True
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Return the process-wide ModelRegistry, creating it from the configuration on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                config = ConfigurationManager().get_prediction_config()
+                _registry = ModelRegistry(config)
+    return _registry
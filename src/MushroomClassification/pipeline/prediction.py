@@ -1,108 +1,328 @@
-from pathlib import Path
+import time
 
-import mlflow
-import pandas as pd
-from sklearn.preprocessing import OneHotEncoder
+import numpy as np
 
-from MushroomClassification.utils.common import load_bin
+from MushroomClassification.pipeline.model_registry import get_model_registry
+from MushroomClassification.utils.input_encoding import (UNKNOWN, InputEncoder,
+                                                         codes_to_index,
+                                                         record_error,
+                                                         record_to_index,
+                                                         records_to_codes)
+
+EXPECTED_FEATURES_BY_MODEL = [
+    "bruises_f",
+    "bruises_t",
+    "odor_f",
+    "odor_n",
+    "gill-spacing_w",
+    "gill-size_b",
+    "gill-size_n",
+    "gill-color_b",
+    "stalk-surface-above-ring_k",
+    "stalk-surface-above-ring_s",
+    "stalk-surface-below-ring_k",
+    "stalk-surface-below-ring_s",
+    "ring-type_l",
+    "ring-type_p",
+    "spore-print-color_h",
+    "spore-print-color_k",
+    "spore-print-color_n",
+    "spore-print-color_w",
+    "population_v",
+]
+
+# encoder used when no encoder was saved by the data transformation stage
+default_encoder = InputEncoder(EXPECTED_FEATURES_BY_MODEL)
+
+
+class CompiledTreePredictor:
+    def __init__(self, tree: np.ndarray):
+        """
+        Predicts with a decision tree compiled by ``compile_tree`` in
+        ``components/model_training.py``, without sklearn or pandas.
+
+        :param tree: structured array with the feature, threshold, left, right and
+            label of every node, leaves pointing to themselves
+        """
+        self.tree = tree
+        self.feature = tree["feature"]
+        self.threshold = tree["threshold"]
+        self.left = tree["left"]
+        self.right = tree["right"]
+        self.label = tree["label"]
+
+        # plain Python nodes for single-row predictions
+        self.nodes = list(
+            zip(
+                self.feature.tolist(),
+                self.threshold.tolist(),
+                self.left.tolist(),
+                self.right.tolist(),
+            )
+        )
+        self.labels = self.label.tolist()
+        self.depth = self._depth()
+
+    def _depth(self) -> int:
+        """Number of steps from the root to the deepest leaf."""
+        depth, frontier = 0, {0}
+        while True:
+            children = {
+                child
+                for node in frontier
+                for child in (self.nodes[node][2], self.nodes[node][3])
+                if child != node
+            }
+            if not children:
+                return depth
+            depth, frontier = depth + 1, children
+
+    @classmethod
+    def load(cls, path, mmap_mode=None) -> "CompiledTreePredictor":
+        """Load a compiled tree saved with ``numpy.save``."""
+        return cls(np.load(path, mmap_mode=mmap_mode))
+
+    def predict_one(self, x) -> int:
+        """
+        Predict the label of a single row.
+
+        :param x: sequence of feature values
+        :return: predicted class label
+        """
+        node = 0
+        feature, threshold, left, right = self.nodes[0]
+        while left != node:
+            node = left if x[feature] <= threshold else right
+            feature, threshold, left, right = self.nodes[node]
+        return self.labels[node]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict the labels of a batch, moving all rows one level down the tree per step.
+
+        :param X: array of shape (n, number of features)
+        :return: array of predicted class labels
+        """
+        rows = np.arange(len(X))
+        node = np.zeros(len(X), dtype=np.intp)
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.label[node]
 
 
 class Prediction:
     def __init__(self, input_data):
+        """
+        :param input_data: a single input record for ``classify``, or a list of
+            input records for ``classify_many``, which also takes an array of their value
+            positions (see ``records_to_codes`` and ``frame_to_codes``)
+        """
         self.input_data = input_data
 
-    def transform(self):
-        """
-        Transforms the input data according to the model's requirements.
+        # seconds spent in the model-load, transform and predict phases of the last call
+        self.timings = {}
 
-        1. Converts the input data to a pandas DataFrame.
-        2. Replaces hyphens with underscores in column names.
-        3. One-hot encodes the categorical data using sklearn.preprocessing.OneHotEncoder.
-        4. Converts the encoded data to a pandas DataFrame.
-        5. Adds missing columns from expected_features_by_model with values of 0.
-        6. Filters the DataFrame to keep only columns present in expected_features_by_model.
-
-        :return: transformed DataFrame
-        """
-
-        expected_features_by_model = [
-            "bruises_f",
-            "bruises_t",
-            "odor_f",
-            "odor_n",
-            "gill-spacing_w",
-            "gill-size_b",
-            "gill-size_n",
-            "gill-color_b",
-            "stalk-surface-above-ring_k",
-            "stalk-surface-above-ring_s",
-            "stalk-surface-below-ring_k",
-            "stalk-surface-below-ring_s",
-            "ring-type_l",
-            "ring-type_p",
-            "spore-print-color_h",
-            "spore-print-color_k",
-            "spore-print-color_n",
-            "spore-print-color_w",
-            "population_v",
-        ]
+        # error of every input record left out of the last ``classify_many``, by position
+        self.errors = {}
 
-        # convert to dataframe
-        self.df = pd.DataFrame([self.input_data])
+    def _lap(self, phase, start):
+        """Record the seconds spent in ``phase`` since ``start`` and return the current time."""
+        now = time.perf_counter()
+        self.timings[phase] = now - start
+        return now
 
-        # Replace hyphens with underscores in column names
-        self.df.columns = self.df.columns.str.replace("-", "_")
+    @staticmethod
+    def _encoder():
+        """Return the encoder of the resident model, or the default one."""
+        return get_model_registry().get().encoder or default_encoder
 
-        cols = [col for col in self.df.columns]
+    def _codes(self):
+        """
+        Value positions of the input records, which may already be given as an array.
 
-        # one hot encode
-        encoder = OneHotEncoder(sparse_output=False)
-        data_encoded = encoder.fit_transform(self.df)
+        Values outside the domain of their field are coded as UNKNOWN. Records that cannot
+        be coded at all, e.g. missing a field, are left out and their errors recorded in
+        ``self.errors``.
+        """
+        if isinstance(self.input_data, np.ndarray):
+            return self.input_data
+        try:
+            return records_to_codes(self.input_data, strict=False)
+        except (KeyError, TypeError):
+            pass
 
-        # Convert encoded data to DataFrame
-        df_encoded = pd.DataFrame(
-            data_encoded, columns=encoder.get_feature_names_out(cols)
+        # only looked for record by record once the vectorized pass failed
+        for row, record in enumerate(self.input_data):
+            error = record_error(record)
+            if error is not None:
+                self.errors[row] = error
+        return records_to_codes(
+            [
+                record
+                for row, record in enumerate(self.input_data)
+                if row not in self.errors
+            ],
+            strict=False,
         )
-        self.df = df_encoded.astype("int")
 
-        # Add missing columns from expected_features_by_model with values of 0
-        missing_columns = list(set(expected_features_by_model) - set(self.df.columns))
+    def _with_errors(self, result):
+        """Result of every input record, None for the ones left out in ``self.errors``."""
+        if not self.errors:
+            return result
+        results = iter(result)
+        return [
+            None if row in self.errors else next(results)
+            for row in range(len(self.input_data))
+        ]
 
-        for col in missing_columns:
-            self.df[col] = 0
+    def transform(self, encoder=None):
+        """
+        Transforms the input data according to the model's requirements.
 
-        # Filter DataFrame to keep only columns present in expected_features_by_model
-        self.df = self.df[expected_features_by_model]
+        The record is one-hot encoded with the encoder fitted during training (see
+        ``FeatureEngineeringConcreteStrategy.get_encoder_artifact``), which maps every
+        value straight to the integer index of its feature column. Without a saved encoder
+        the columns of EXPECTED_FEATURES_BY_MODEL are used.
+
+        :param encoder: InputEncoder to use, defaults to the one of the resident model
+        :return: None, the encoded record is stored in ``self.X`` and ``self.df``
+        """
+        # only needed to hand the model named columns, so not imported with the module
+        import pandas as pd
+
+        encoder = encoder or self._encoder()
+        self.X = encoder.encode_record(self.input_data)
+        self.df = pd.DataFrame(self.X, columns=encoder.feature_names)
 
     def classify(self):
         """
-        Classify the given input data using the model from MLflow.
+        Classify the given input data using the model resident in the ModelRegistry.
+
+        The registry loads the model once per process (from MLflow, with the local model
+        as a fallback) and hot-swaps it when a new local model file lands. When a lookup
+        table was compiled for the resident model, the answer is read from it directly,
+        otherwise the compiled tree is traversed if available.
 
-        If the model from MLflow cannot be loaded, the local model is used as a fallback.
+        The time spent in every phase is recorded in ``self.timings``.
 
         Returns:
             A list of the predicted class labels.
         """
-        model = None
+        self.timings = {}
+        start = time.perf_counter()
+        loaded = get_model_registry().get()
+        start = self._lap("model-load", start)
+
+        # answer from the compiled lookup table if possible
+        if loaded.lookup_table is not None:
+            index = record_to_index(self.input_data)
+            if index is not None:
+                start = self._lap("transform", start)
+                result = [int(loaded.lookup_table[index])]
+                self._lap("predict", start)
+                return result
+
+        encoder = loaded.encoder or default_encoder
+
+        # traverse the compiled tree without sklearn or pandas
+        if loaded.compiled_tree is not None:
+            x = encoder.encode_record(self.input_data)[0].tolist()
+            start = self._lap("transform", start)
+            result = [loaded.compiled_tree.predict_one(x)]
+            self._lap("predict", start)
+            return result
 
         # transform the data
-        self.transform()
+        self.transform(encoder)
+        start = self._lap("transform", start)
 
-        # load model from mlflow
-        logged_model = "runs:/f545379e93534628a9516c942aee14da/model"
-        try:
-            # Attempt to load the model from MLflow
-            model = mlflow.pyfunc.load_model(logged_model)
-            print("MLflow model loaded successfully")
-        except Exception as e:
-            print(f"Error loading MLflow model: {e}")
-
-            if model == None:
-                # Fallback to loading the local model
-                model = load_bin(
-                    Path("artifacts/model_training/decision_tree_model.joblib")
-                )
-                print("Local model loaded successfully")
+        # return the result
+        result = loaded.model.predict(self.df).tolist()
+        self._lap("predict", start)
+        return result
+
+    def transform_many(self, encoder=None, codes=None):
+        """
+        Transforms a list of input records according to the model's requirements.
+
+        All records are encoded at once: the values are mapped to their positions field by
+        field with vectorized NumPy lookups and one-hot encoded into a single uint8 matrix.
+
+        :param encoder: InputEncoder to use, defaults to the one of the resident model
+        :param codes: value positions of the records to encode, defaults to all of them
+        :return: None, the encoded records are stored in ``self.X`` and ``self.df``
+        """
+        import pandas as pd
+
+        encoder = encoder or self._encoder()
+        self.X = encoder.encode_codes(self._codes() if codes is None else codes)
+        self.df = pd.DataFrame(self.X, columns=encoder.feature_names)
+
+    def classify_many(self):
+        """
+        Classify a list of input records with a single call to the model.
+
+        Records whose values are all in the domain are answered from the lookup table
+        when one was compiled for the resident model. The others, e.g. with a value the
+        lookup table has no entry for, are scored like ``classify`` scores them: their
+        unknown values encode to no feature column, and the compiled tree, or else the
+        model, predicts them in one call.
+
+        A record that cannot be scored at all, e.g. missing a field, does not fail the
+        others: its result is None and its error is recorded in ``self.errors``.
+
+        The time spent in every phase is recorded in ``self.timings``.
+
+        Returns:
+            A list of the predicted class labels, one per input record.
+        """
+        self.timings = {}
+        self.errors = {}
+        if len(self.input_data) == 0:
+            return []
+
+        start = time.perf_counter()
+        loaded = get_model_registry().get()
+        start = self._lap("model-load", start)
+
+        codes = self._codes()
+        if len(codes) == 0:
+            return self._with_errors([])
+
+        rest = None
+        if loaded.lookup_table is not None:
+            known = (codes != UNKNOWN).all(axis=1)
+            if known.all():
+                # answer every record from the compiled lookup table
+                index = codes_to_index(codes)
+                start = self._lap("transform", start)
+                result = loaded.lookup_table[index].tolist()
+                self._lap("predict", start)
+                return self._with_errors(result)
+            rest = np.flatnonzero(~known)
+            labels = np.empty(len(codes), dtype=loaded.lookup_table.dtype)
+            labels[known] = loaded.lookup_table[codes_to_index(codes[known])]
+            codes = codes[rest]
+
+        encoder = loaded.encoder or default_encoder
+
+        if loaded.compiled_tree is not None:
+            # traverse the compiled tree without sklearn or pandas
+            X = encoder.encode_codes(codes)
+            start = self._lap("transform", start)
+            predicted = loaded.compiled_tree.predict(X)
+        else:
+            # transform the data
+            self.transform_many(encoder, codes)
+            start = self._lap("transform", start)
+            predicted = loaded.model.predict(self.df)
+
+        if rest is not None:
+            labels[rest] = predicted
+            predicted = labels
 
         # return the result
-        return model.predict(self.df).tolist()
+        result = predicted.tolist()
+        self._lap("predict", start)
+        return self._with_errors(result)
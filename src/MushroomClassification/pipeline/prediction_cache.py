@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from MushroomClassification import logger
+from MushroomClassification.constants import INPUT_DOMAIN
+from MushroomClassification.pipeline.model_registry import get_model_registry
+from MushroomClassification.pipeline.prediction import Prediction
+
+
+def cache_key(record: dict) -> Optional[Tuple[str, ...]]:
+    """
+    Canonical key of an input record: its values in the order of INPUT_DOMAIN, or None
+    when the record cannot be scored, e.g. it misses a field, and is never cached.
+    """
+    try:
+        key = tuple(record[field] for field in INPUT_DOMAIN)
+    except (KeyError, TypeError):
+        return None
+    return key if all(isinstance(value, str) for value in key) else None
+
+
+class PredictionCache:
+    def __init__(self, max_size: int = 4096):
+        """
+        Bounded LRU cache of prediction results in front of ``Prediction``.
+
+        Results are keyed by the canonical tuple of the record's values and tagged with
+        the fingerprint of the model that produced them. When the resident model's
+        version changes, e.g. after retraining, the whole cache is dropped before it
+        answers anything. Beyond ``max_size`` entries the least recently used one is
+        evicted. A ``max_size`` of 0 disables caching.
+
+        :param max_size: maximum number of cached results
+        """
+        self.max_size = max_size
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[Tuple[str, ...], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: str):
+        """Drop every entry if the results were produced by another model. Caller holds the lock."""
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+                logger.info(
+                    f"Model changed from {self.version} to {version}, "
+                    f"dropped {len(self._entries)} cached predictions"
+                )
+            self._entries.clear()
+            self.version = version
+
+    def classify_many(self, records: List[dict]) -> Tuple[list, dict, Dict[int, str]]:
+        """
+        Classify input records, scoring only the ones not cached with a single call.
+
+        :param records: input records with one value per field of INPUT_DOMAIN
+        :return: (predicted class labels, None for the records that could not be scored,
+            seconds spent in the cache and in every phase of the prediction of the
+            misses, error of every record that could not be scored by position)
+        """
+        if self.max_size <= 0:
+            prediction = Prediction(records)
+            return prediction.classify_many(), prediction.timings, prediction.errors
+
+        start = time.perf_counter()
+        version = get_model_registry().get().version
+        keys = [cache_key(record) for record in records]
+        results = [None] * len(records)
+        missing = []
+        with self._lock:
+            self._check_version(version)
+            for i, key in enumerate(keys):
+                result = self._entries.get(key) if key is not None else None
+                if result is None:
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    results[i] = result
+            self.hits += len(records) - len(missing)
+            self.misses += len(missing)
+        timings = {"cache": time.perf_counter() - start}
+        if not missing:
+            return results, timings, {}
+
+        prediction = Prediction([records[i] for i in missing])
+        predicted = prediction.classify_many()
+        timings.update(prediction.timings)
+        for i, result in zip(missing, predicted):
+            results[i] = result
+        errors = {missing[row]: error for row, error in prediction.errors.items()}
+
+        with self._lock:
+            # results of a model swapped out in the meantime are returned but not kept
+            if get_model_registry().version == self.version == version:
+                for i, result in zip(missing, predicted):
+                    if result is not None:
+                        self._entries[keys[i]] = result
+                        self._entries.move_to_end(keys[i])
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return results, timings, errors
+
+    def clear(self):
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Current size and hit, miss, eviction and invalidation counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "model_version": self.version,
+        }
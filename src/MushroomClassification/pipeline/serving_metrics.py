@@ -0,0 +1,56 @@
+from MushroomClassification.utils.metrics import CONTENT_TYPE, REGISTRY
+
+# Metrics of the FastAPI app, served on /metrics next to the model load metrics of the
+# ModelRegistry. They are defined in the package rather than in fastapiApp.py so that
+# every metric lands in the registry of ``MushroomClassification.utils.metrics``, which
+# the package modules import, even though the app imports ``src.MushroomClassification``.
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total",
+    "HTTP requests by method, route and status",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time spent answering HTTP requests",
+    ("method", "route"),
+)
+PREDICT_REQUESTS = REGISTRY.counter(
+    "predict_requests_total",
+    "Prediction requests by route and outcome",
+    ("route", "outcome"),
+)
+PREDICTED_RECORDS = REGISTRY.counter(
+    "predict_records_total", "Records classified", ("route",)
+)
+PREDICT_PHASE_SECONDS = REGISTRY.histogram(
+    "predict_phase_duration_seconds",
+    "Time spent in every phase of a prediction request: validation, queue, cache, "
+    "model-load, transform and predict",
+    ("route", "phase"),
+)
+CACHE_ENTRIES = REGISTRY.gauge(
+    "prediction_cache_entries", "Results held by the prediction cache"
+)
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "prediction_cache_hit_ratio", "Share of records answered by the prediction cache"
+)
+BATCHER_QUEUE_DEPTH = REGISTRY.gauge(
+    "batcher_queue_depth", "Records waiting for the next /predict batch"
+)
+BATCHER_MEAN_BATCH_SIZE = REGISTRY.gauge(
+    "batcher_mean_batch_size", "Mean number of records scored per /predict batch"
+)
+
+
+def record_prediction(route, timings, records):
+    """Count a successful prediction request and observe the time of its phases."""
+    PREDICT_REQUESTS.inc(route=route, outcome="ok")
+    PREDICTED_RECORDS.inc(records, route=route)
+    for phase, seconds in timings.items():
+        PREDICT_PHASE_SECONDS.observe(seconds, route=route, phase=phase)
+
+
+def render_metrics() -> str:
+    """Every metric of the process in the Prometheus text exposition format."""
+    return REGISTRY.render()
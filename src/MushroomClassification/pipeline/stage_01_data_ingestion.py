@@ -3,6 +3,7 @@ from zenml.steps import step
 from MushroomClassification import logger
 from MushroomClassification.components.data_ingestion import DataIngestion
 from MushroomClassification.config.configuration import ConfigurationManager
+from MushroomClassification.utils.profiler import get_profiler
 
 STAGE_NAME = "Data Ingestion Stage"
 
@@ -18,16 +19,18 @@ def data_ingestion_step() -> bool:
         logger.info(f"\n\n>>>>> {STAGE_NAME} started. <<<<<\n\n")
 
         config_manager = ConfigurationManager()
-        config = config_manager.get_data_ingestion_config()
-        data_ingestion = DataIngestion(config)
-        data_ingestion = data_ingestion.create_data_ingestion()
-
-        # Start the data ingestion process
-        logger.info("Downloading data...")
-        data_ingestion.download_file()
-
-        logger.info("Extracting data...")
-        data_ingestion.extract_zip_file()
+        profiler = get_profiler(config_manager.get_profiling_config())
+        with profiler.stage(STAGE_NAME):
+            config = config_manager.get_data_ingestion_config()
+            data_ingestion = DataIngestion(config)
+            data_ingestion = data_ingestion.create_data_ingestion()
+
+            # Start the data ingestion process
+            logger.info("Downloading data...")
+            data_ingestion.download_file()
+
+            logger.info("Extracting data...")
+            data_ingestion.extract_zip_file()
 
         logger.info(f"\n\n>>>>> {STAGE_NAME} completed. <<<<<\n\n")
         return True
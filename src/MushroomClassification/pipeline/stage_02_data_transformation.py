@@ -4,6 +4,8 @@ from MushroomClassification import logger
 from MushroomClassification.components.data_transformation import \
     DataTransformation
 from MushroomClassification.config.configuration import ConfigurationManager
+from MushroomClassification.utils.profiler import get_profiler
+from MushroomClassification.utils.stage_cache import StageCache
 
 STAGE_NAME = "Data Transformation Stage"
 
@@ -17,12 +19,29 @@ def data_transformation_step(success: bool) -> bool:
 
         logger.info(f"\n\n>>>>> {STAGE_NAME} started. <<<<<\n\n")
         config_manager = ConfigurationManager()
-        config = config_manager.get_data_transformation_config()
-        data_transformation = DataTransformation(config)
-
-        # Start the data transformation process
-        logger.info("Transforming the data...")
-        data_transformation.transform_data()
+        profiler = get_profiler(config_manager.get_profiling_config())
+        with profiler.stage(STAGE_NAME) as stage:
+            config = config_manager.get_data_transformation_config()
+            cache = StageCache(
+                STAGE_NAME,
+                config_manager.get_stage_cache_config(),
+                config,
+                inputs=[config.archive_path or config.data_path],
+                outputs=[config.transformed_data, config.encoder]
+                + ([config.profile] if config.eda == "profile" else []),
+                code=[DataTransformation],
+            )
+
+            if cache.is_fresh():
+                stage["cached"] = True
+                logger.info("Data and code unchanged, reusing the transformed data")
+            else:
+                data_transformation = DataTransformation(config)
+
+                # Start the data transformation process
+                logger.info("Transforming the data...")
+                data_transformation.transform_data()
+                cache.save()
 
         logger.info(f"\n\n>>>>> {STAGE_NAME} completed. <<<<<\n\n")
 
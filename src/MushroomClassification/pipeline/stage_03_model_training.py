@@ -3,6 +3,8 @@ from zenml.steps import step
 from MushroomClassification import logger
 from MushroomClassification.components.model_training import ModelTraining
 from MushroomClassification.config.configuration import ConfigurationManager
+from MushroomClassification.utils.profiler import get_profiler
+from MushroomClassification.utils.stage_cache import StageCache
 
 STAGE_NAME = "Model Training Stage"
 
@@ -16,13 +18,39 @@ def model_training_step(success: bool) -> bool:
 
         logger.info(f"\n\n>>>>> {STAGE_NAME} started. <<<<<\n\n")
         config_manager = ConfigurationManager()
-        config = config_manager.get_model_training_config()
-        training = ModelTraining(config, enable_mlflow_logging=False)
-
-        # Start the data transformation process
-        logger.info("Doing data splits and Training model...")
-        training.data_splits()
-        training.train_model()
+        profiler = get_profiler(config_manager.get_profiling_config())
+        with profiler.stage(STAGE_NAME) as stage:
+            config = config_manager.get_model_training_config()
+            outputs = [
+                config.model,
+                config.compiled_model,
+                config.compiled_model_meta,
+                config.test_data,
+            ]
+            if config.model_tuning.enabled:
+                outputs.append(config.best_params)
+            cache = StageCache(
+                STAGE_NAME,
+                config_manager.get_stage_cache_config(),
+                config,
+                inputs=[config.transformed_data],
+                outputs=outputs,
+                code=[ModelTraining],
+            )
+
+            if cache.is_fresh():
+                stage["cached"] = True
+                logger.info(
+                    "Data, params and code unchanged, reusing the trained model"
+                )
+            else:
+                training = ModelTraining(config, enable_mlflow_logging=False)
+
+                # Start the data transformation process
+                logger.info("Doing data splits and Training model...")
+                training.data_splits()
+                training.train_model()
+                cache.save()
 
         logger.info(f"\n\n>>>>> {STAGE_NAME} completed. <<<<<\n\n")
 
@@ -3,6 +3,8 @@ from zenml.steps import step
 from MushroomClassification import logger
 from MushroomClassification.components.model_evaluation import ModelEvaluation
 from MushroomClassification.config.configuration import ConfigurationManager
+from MushroomClassification.utils.profiler import get_profiler
+from MushroomClassification.utils.stage_cache import StageCache
 
 STAGE_NAME = "Model Evaluation Stage"
 
@@ -16,12 +18,28 @@ def model_evaluation_step(success: bool) -> bool:
 
         logger.info(f"\n\n>>>>> {STAGE_NAME} started. <<<<<\n\n")
         config_manager = ConfigurationManager()
-        config = config_manager.get_model_evaluation_config()
-        evaluate = ModelEvaluation(config, enable_mlflow_logging=False)
-
-        # Start the data transformation process
-        logger.info("Evaluating model...")
-        evaluate.evaluate()
+        profiler = get_profiler(config_manager.get_profiling_config())
+        with profiler.stage(STAGE_NAME) as stage:
+            config = config_manager.get_model_evaluation_config()
+            cache = StageCache(
+                STAGE_NAME,
+                config_manager.get_stage_cache_config(),
+                config,
+                inputs=[config.model, config.test_data],
+                outputs=[config.scores, config.report],
+                code=[ModelEvaluation],
+            )
+
+            if cache.is_fresh():
+                stage["cached"] = True
+                logger.info("Model and test data unchanged, reusing the scores")
+            else:
+                evaluate = ModelEvaluation(config, enable_mlflow_logging=False)
+
+                # Start the data transformation process
+                logger.info("Evaluating model...")
+                evaluate.evaluate()
+                cache.save()
 
         logger.info(f"\n\n>>>>> {STAGE_NAME} completed. <<<<<\n\n")
 
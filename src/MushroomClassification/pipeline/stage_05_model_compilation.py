@@ -0,0 +1,50 @@
+from zenml.steps import step
+
+from MushroomClassification import logger
+from MushroomClassification.components.model_compilation import \
+    ModelCompilation
+from MushroomClassification.config.configuration import ConfigurationManager
+from MushroomClassification.utils.profiler import get_profiler
+from MushroomClassification.utils.stage_cache import StageCache
+
+STAGE_NAME = "Model Compilation Stage"
+
+
+@step
+def model_compilation_step(success: bool) -> bool:
+    """
+    This ZenML step compiles the trained model into a lookup table over every possible prediction input.
+    """
+    try:
+
+        logger.info(f"\n\n>>>>> {STAGE_NAME} started. <<<<<\n\n")
+        config_manager = ConfigurationManager()
+        profiler = get_profiler(config_manager.get_profiling_config())
+        with profiler.stage(STAGE_NAME) as stage:
+            config = config_manager.get_model_compilation_config()
+            cache = StageCache(
+                STAGE_NAME,
+                config_manager.get_stage_cache_config(),
+                config,
+                inputs=[config.model],
+                outputs=[config.lookup_table, config.lookup_table_meta],
+                code=[ModelCompilation],
+            )
+
+            if cache.is_fresh():
+                stage["cached"] = True
+                logger.info("Model unchanged, reusing the lookup table")
+            else:
+                compilation = ModelCompilation(config)
+
+                # Start the model compilation process
+                logger.info("Compiling model...")
+                compilation.compile_lookup_table()
+                cache.save()
+
+        logger.info(f"\n\n>>>>> {STAGE_NAME} completed. <<<<<\n\n")
+
+        return True
+    except Exception as e:
+        logger.exception(f"Error during compilation: {e}")
+        raise e
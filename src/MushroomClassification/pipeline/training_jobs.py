@@ -0,0 +1,157 @@
+import os
+import re
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from MushroomClassification import logger
+from MushroomClassification.entity.config_entity import TrainingJobConfig
+
+# stage boundaries logged by every pipeline step, e.g. ">>>>> Model Training Stage started. <<<<<"
+STAGE_MARKER = re.compile(r">>>>> (?P<stage>.+?) (?P<event>started|completed)\. <<<<<")
+
+
+class TrainingJob:
+    def __init__(self, command: str, log_dir: Path, max_log_lines: int):
+        """
+        A single run of the training command and what was observed while it ran.
+
+        :param command: shell-like command running the training pipeline
+        :param log_dir: directory receiving the full output of the command as ``<id>.log``
+        :param max_log_lines: number of most recent output lines kept in memory
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.command = command
+        self.log_path = Path(log_dir) / f"{self.id}.log"
+        self.status = "queued"
+        self.returncode: Optional[int] = None
+        self.error: Optional[str] = None
+        self.model_version: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.logs = deque(maxlen=max_log_lines)
+        self.stages: Dict[str, dict] = {}
+
+    def record_line(self, line: str):
+        """Keep an output line and time the stage it starts or completes."""
+        self.logs.append(line)
+        match = STAGE_MARKER.search(line)
+        if match is None:
+            return
+
+        now = time.time()
+        stage = self.stages.setdefault(match["stage"], {})
+        if match["event"] == "started":
+            stage["started_at"] = now
+        else:
+            stage["finished_at"] = now
+            if "started_at" in stage:
+                stage["duration"] = now - stage["started_at"]
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_dict(self, log_lines: int = 100) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "command": self.command,
+            "returncode": self.returncode,
+            "error": self.error,
+            "model_version": self.model_version,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": self.duration,
+            "stages": self.stages,
+            "log_file": str(self.log_path),
+            "logs": list(self.logs)[-log_lines:],
+        }
+
+
+class TrainingJobManager:
+    def __init__(
+        self,
+        config: TrainingJobConfig,
+        on_success: Optional[Callable[[TrainingJob], None]] = None,
+    ):
+        """
+        Runs the training pipeline in a subprocess so the serving process stays responsive.
+
+        A job is started with ``submit`` and returns immediately; a background thread
+        streams the output of the subprocess into the job (and its log file), timing every
+        pipeline stage from the markers the stages log. Only one job runs at a time.
+
+        :param config: TrainingJobConfig object with the command and the log directory
+        :param on_success: called with the job once the command exits successfully,
+            e.g. to hot-reload the model
+        """
+        self.config = config
+        self.on_success = on_success
+        self.jobs: Dict[str, TrainingJob] = {}
+        self._running: Optional[TrainingJob] = None
+        self._lock = threading.Lock()
+
+    def submit(self) -> TrainingJob:
+        """Start a training job, or return the one already running."""
+        with self._lock:
+            if self._running is not None:
+                return self._running
+
+            job = TrainingJob(
+                self.config.command, self.config.root_dir, self.config.max_log_lines
+            )
+            self.jobs[job.id] = job
+            self._running = job
+
+        threading.Thread(target=self._run, args=(job,), daemon=True).start()
+        logger.info(f"Training job {job.id} submitted: {job.command}")
+        return job
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self.jobs.get(job_id)
+
+    def _run(self, job: TrainingJob):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            env = dict(os.environ, PYTHONUNBUFFERED="1")
+            with open(job.log_path, "w") as log_file, subprocess.Popen(
+                shlex.split(job.command),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                env=env,
+            ) as process:
+                for line in process.stdout:
+                    log_file.write(line)
+                    job.record_line(line.rstrip("\n"))
+            job.returncode = process.returncode
+
+            if job.returncode != 0:
+                job.status = "failed"
+                job.error = f"Command exited with status {job.returncode}"
+            else:
+                if self.on_success is not None:
+                    self.on_success(job)
+                job.status = "succeeded"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._running = None
+            logger.info(
+                f"Training job {job.id} {job.status} in {job.duration:.1f}s, stages: {job.stages}"
+            )
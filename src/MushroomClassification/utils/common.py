@@ -1,9 +1,11 @@
+import hashlib
 import json
 import os
+import zipfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
-import joblib
 import yaml
 from box import ConfigBox
 from box.exceptions import BoxValueError
@@ -89,6 +91,8 @@ def save_bin(data, path: Path):
         data (Any): data to be saved as binary
         path (Path): path to binary file
     """
+    import joblib
+
     joblib.dump(value=data, filename=path)
     logger.info(f"binary file saved at: {path}")
 
@@ -102,6 +106,247 @@ def load_bin(path: Path):
     Returns:
         Any: object stored in the file
     """
+    import joblib
+
     data = joblib.load(path)
     logger.info(f"binary file loaded from: {path}")
     return data
+
+
+def save_array(array, path: Path):
+    """save a numpy array to a .npy file, replacing any previous file atomically
+
+    The array is written to a temporary file first and moved into place, so that
+    processes memory-mapping the previous file keep reading it intact.
+
+    Args:
+        array (np.ndarray): array to be saved
+        path (Path): path to the .npy file
+    """
+    import numpy as np
+
+    path = Path(path)
+    partial_path = path.with_name(path.name + ".part")
+    with open(partial_path, "wb") as f:
+        np.save(f, array)
+    os.replace(partial_path, path)
+    logger.info(f"array saved at: {path}")
+
+
+def compact_dtypes(df):
+    """downcast integer columns that only hold values in [0, 255] to uint8
+
+    Args:
+        df (pd.DataFrame): data to downcast
+
+    Returns:
+        pd.DataFrame: data with compact column types
+    """
+    import numpy as np
+
+    int_cols = df.select_dtypes(include=["integer"]).columns
+    if len(int_cols) == 0:
+        return df
+
+    values = df[int_cols]
+    small = int_cols[(values.min() >= 0) & (values.max() <= 255)]
+    return df.astype({col: np.uint8 for col in small})
+
+
+def save_dataframe(df, path: Path):
+    """save a dataframe as an artifact, the file extension choosing the format
+
+    Supported formats are .feather (written uncompressed so it can be memory-mapped),
+    .parquet and .csv. Columns holding small non-negative integers are stored as uint8.
+
+    Args:
+        df (pd.DataFrame): data to be saved
+        path (Path): path to the artifact file
+    """
+    df = compact_dtypes(df)
+    suffix = path.suffix.lower()
+    if suffix == ".feather":
+        df.reset_index(drop=True).to_feather(path, compression="uncompressed")
+    elif suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    elif suffix == ".csv":
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported artifact format: {path}")
+
+    logger.info(f"dataframe saved at: {path}")
+
+
+def load_dataframe(path: Path, memory_map: bool = False):
+    """load a dataframe artifact saved with save_dataframe
+
+    Args:
+        path (Path): path to the artifact file
+        memory_map (bool, optional): memory-map .feather and .parquet files instead of
+            reading them into buffers. Defaults to False.
+
+    Returns:
+        pd.DataFrame: the loaded data
+    """
+    import pandas as pd
+
+    suffix = path.suffix.lower()
+    if suffix == ".feather":
+        from pyarrow import feather
+
+        df = feather.read_table(path, memory_map=memory_map).to_pandas()
+    elif suffix == ".parquet":
+        df = pd.read_parquet(path, memory_map=memory_map)
+    elif suffix == ".csv":
+        df = compact_dtypes(pd.read_csv(path))
+    else:
+        raise ValueError(f"Unsupported artifact format: {path}")
+
+    logger.info(f"dataframe loaded from: {path}")
+    return df
+
+
+def iter_dataframe(path: Path, chunksize: int):
+    """iterate over a dataframe artifact saved with save_dataframe in chunks of rows
+
+    .feather files are memory-mapped and .parquet files read batch by batch, so only one
+    chunk is held in memory at a time.
+
+    Args:
+        path (Path): path to the artifact file
+        chunksize (int): number of rows per chunk
+
+    Yields:
+        pd.DataFrame: the chunks, in order
+    """
+    import pandas as pd
+
+    suffix = path.suffix.lower()
+    if suffix == ".feather":
+        import pyarrow as pa
+
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                for offset in range(0, batch.num_rows, chunksize):
+                    yield batch.slice(offset, chunksize).to_pandas()
+    elif suffix == ".parquet":
+        from pyarrow import parquet
+
+        for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    elif suffix == ".csv":
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            yield compact_dtypes(chunk)
+    else:
+        raise ValueError(f"Unsupported artifact format: {path}")
+
+
+class DataFrameWriter:
+    def __init__(self, path: Path):
+        """write a dataframe artifact chunk by chunk, the file extension choosing the format
+
+        Every chunk must have the same columns and types. Formats are the ones of
+        save_dataframe: .feather (an uncompressed Arrow IPC file), .parquet and .csv.
+
+        Args:
+            path (Path): path to the artifact file
+        """
+        self.path = Path(path)
+        self.suffix = self.path.suffix.lower()
+        if self.suffix not in (".feather", ".parquet", ".csv"):
+            raise ValueError(f"Unsupported artifact format: {path}")
+        self._writer = None
+        self._sink = None
+        self.rows = 0
+
+    def write(self, df):
+        """append a chunk to the artifact
+
+        Args:
+            df (pd.DataFrame): chunk to be written
+        """
+        df = compact_dtypes(df)
+        if self.suffix == ".csv":
+            df.to_csv(
+                self.path,
+                mode="a" if self.rows else "w",
+                header=not self.rows,
+                index=False,
+            )
+        else:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                if self.suffix == ".feather":
+                    self._sink = pa.OSFile(str(self.path), "wb")
+                    self._writer = pa.ipc.new_file(self._sink, table.schema)
+                else:
+                    from pyarrow import parquet
+
+                    self._writer = parquet.ParquetWriter(str(self.path), table.schema)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        """finish the artifact file"""
+        if self._writer is not None:
+            self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        logger.info(f"dataframe of {self.rows} rows written at: {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@contextmanager
+def open_data_file(path: Path, archive_path: Optional[Path] = None):
+    """open a data file for reading, from disk or streamed out of a zip archive
+
+    When an archive is given, the member named like ``path`` is decompressed on the fly
+    as it is read, without extracting it to disk.
+
+    Args:
+        path (Path): path to the data file, only its name is used with an archive
+        archive_path (Path, optional): zip archive holding the file. Defaults to None.
+
+    Yields:
+        binary file object
+    """
+    if archive_path is None:
+        with open(path, "rb") as f:
+            yield f
+        return
+
+    name = Path(path).name
+    with zipfile.ZipFile(archive_path) as archive:
+        members = [m for m in archive.namelist() if Path(m).name == name]
+        if not members:
+            raise FileNotFoundError(f"{name} not found in the archive {archive_path}")
+        with archive.open(members[0]) as f:
+            logger.info(f"streaming {members[0]} out of the archive {archive_path}")
+            yield f
+
+
+@ensure_annotations
+def get_file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    """compute the sha256 digest of a file
+
+    Args:
+        path (Path): path to the file
+        chunk_size (int, optional): bytes read per iteration. Defaults to 1 MiB.
+
+    Returns:
+        str: hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
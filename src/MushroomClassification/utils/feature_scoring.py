@@ -0,0 +1,218 @@
+from typing import Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from scipy import stats
+
+# rows counted per matrix multiply, every count of a block is exact in float32
+BLOCK_SIZE = 1 << 16
+
+# number of set bits of every byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class PackedFeatures:
+    def __init__(self, bits: np.ndarray, n_rows: int):
+        """
+        0/1 features packed eight rows to a byte, see ``pack_features``.
+
+        :param bits: uint8 array of shape (ceil(n_rows / 8), n_features)
+        :param n_rows: number of rows that were packed
+        """
+        self.bits = bits
+        self.n_rows = n_rows
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.n_rows, self.bits.shape[1]
+
+
+def pack_features(X) -> PackedFeatures:
+    """
+    Pack 0/1 features along the rows, holding a column of n rows in n / 8 bytes.
+
+    :param X: 0/1 array-like of shape (n_rows, n_features)
+    :return: PackedFeatures
+    """
+    X = np.asarray(X)
+    return PackedFeatures(np.packbits(X != 0, axis=0), len(X))
+
+
+def f_classif_from_counts(class_counts, feature_class_counts):
+    """
+    ANOVA F-value of binary features computed from per-class counts only.
+
+    For a 0/1 feature the sum and the sum of squares within a class are both the number
+    of rows of that class where the feature is set, so the statistic of
+    ``sklearn.feature_selection.f_classif`` follows from the counts.
+
+    :param class_counts: array of shape (n_classes,) with the number of rows per class
+    :param feature_class_counts: array of shape (n_classes, n_features) with the number
+        of rows of every class where every feature is set
+    :return: array of shape (n_features,) with the F-values
+    """
+    n_c = np.asarray(class_counts, dtype=np.float64)[:, None]
+    s_c = np.asarray(feature_class_counts, dtype=np.float64)
+    n, k = n_c.sum(), len(n_c)
+
+    s = s_c.sum(axis=0)
+    sstot = s - s**2 / n
+    ssbn = (s_c**2 / n_c).sum(axis=0) - s**2 / n
+    sswn = sstot - ssbn
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (ssbn / (k - 1)) / (sswn / (n - k))
+
+
+def chi2_from_counts(class_counts, feature_class_counts):
+    """
+    Chi-squared statistic of binary features computed from per-class counts only, the
+    statistic of ``sklearn.feature_selection.chi2``.
+
+    :param class_counts: array of shape (n_classes,) with the number of rows per class
+    :param feature_class_counts: array of shape (n_classes, n_features) with the number
+        of rows of every class where every feature is set
+    :return: array of shape (n_features,) with the statistics
+    """
+    n_c = np.asarray(class_counts, dtype=np.float64)
+    observed = np.asarray(feature_class_counts, dtype=np.float64)
+    expected = np.outer(n_c / n_c.sum(), observed.sum(axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return ((observed - expected) ** 2 / expected).sum(axis=0)
+
+
+def mutual_info_from_counts(class_counts, feature_class_counts):
+    """
+    Mutual information (in nats) between every binary feature and the class, computed
+    from the 2 x n_classes contingency table of the feature being set or not. Equal to
+    ``mutual_info_classif`` with ``discrete_features=True``.
+
+    :param class_counts: array of shape (n_classes,) with the number of rows per class
+    :param feature_class_counts: array of shape (n_classes, n_features) with the number
+        of rows of every class where every feature is set
+    :return: array of shape (n_features,) with the mutual information
+    """
+    n_c = np.asarray(class_counts, dtype=np.float64)[:, None]
+    s_c = np.asarray(feature_class_counts, dtype=np.float64)
+    n = n_c.sum()
+
+    # joint counts of (feature set, class) and (feature not set, class)
+    joint = np.stack([s_c, n_c - s_c])
+    feature = joint.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = joint / n * np.log(joint * n / (feature * n_c[None]))
+    return np.where(joint > 0, terms, 0.0).sum(axis=(0, 1))
+
+
+class FeatureScorer:
+    SCORES = ("f_classif", "chi2", "mutual_info")
+
+    def __init__(self, score="f_classif", block_size=BLOCK_SIZE):
+        """
+        Scores binary (one-hot) features against a class from class-conditional counts.
+
+        Every score only depends on the number of rows of each class and on the number of
+        rows of each class where each feature is set. Those counts are computed for all
+        features at once by multiplying the one-hot encoded classes with the features,
+        block by block, so a uint8 matrix is never copied to float64 as a whole. Sparse
+        matrices are multiplied directly and features packed with ``pack_features`` are
+        counted with a popcount of their bytes.
+
+        An instance is a drop-in ``score_func`` for ``SelectKBest``.
+
+        :param score: "f_classif" (ANOVA F-value), "chi2" or "mutual_info"
+        :param block_size: rows of a dense matrix converted and multiplied at a time
+        """
+        if score not in self.SCORES:
+            raise ValueError(f"Unknown score {score!r}, expected one of {self.SCORES}")
+        self.score = score
+        self.block_size = block_size
+
+    def __call__(self, X, y):
+        """
+        Score every feature, with the signature of a ``SelectKBest`` score function.
+
+        :param X: 0/1 features as an array, a sparse matrix, a DataFrame or PackedFeatures
+        :param y: class labels
+        :return: (scores, p-values), p-values being None for mutual information
+        """
+        _, class_counts, feature_class_counts = self.counts(X, y)
+        return self.score_counts(class_counts, feature_class_counts)
+
+    def score_counts(self, class_counts, feature_class_counts):
+        """
+        Score every feature from its class-conditional counts.
+
+        :param class_counts: array of shape (n_classes,) with the number of rows per class
+        :param feature_class_counts: array of shape (n_classes, n_features)
+        :return: (scores, p-values), p-values being None for mutual information
+        """
+        n, n_classes = int(np.sum(class_counts)), len(class_counts)
+        if self.score == "f_classif":
+            scores = f_classif_from_counts(class_counts, feature_class_counts)
+            return scores, stats.f.sf(scores, n_classes - 1, n - n_classes)
+        if self.score == "chi2":
+            scores = chi2_from_counts(class_counts, feature_class_counts)
+            return scores, stats.chi2.sf(scores, n_classes - 1)
+        return mutual_info_from_counts(class_counts, feature_class_counts), None
+
+    def counts(self, X, y):
+        """
+        Count the rows of every class and the rows of every class where every feature is set.
+
+        :param X: 0/1 features as an array, a sparse matrix, a DataFrame or PackedFeatures
+        :param y: class labels
+        :return: (classes, class_counts, feature_class_counts of shape (n_classes, n_features))
+        """
+        classes, y_codes = np.unique(np.asarray(y), return_inverse=True)
+        y_codes = y_codes.ravel()
+        class_counts = np.bincount(y_codes, minlength=len(classes))
+
+        if hasattr(X, "sparse"):
+            # sparse DataFrame, without densifying it
+            X = X.sparse.to_coo()
+        elif hasattr(X, "to_numpy"):
+            X = X.to_numpy()
+
+        if isinstance(X, PackedFeatures):
+            counts = self._packed_counts(X, y_codes, len(classes))
+        elif sp.issparse(X):
+            counts = self._sparse_counts(X, y_codes, len(classes))
+        else:
+            counts = self._dense_counts(np.asarray(X), y_codes, len(classes))
+        return classes, class_counts, counts
+
+    def _dense_counts(self, X, y_codes, n_classes):
+        """(n_classes x rows) indicator times (rows x features) block, in float32."""
+        counts = np.zeros((n_classes, X.shape[1]), dtype=np.int64)
+        indicator = np.eye(n_classes, dtype=np.float32)
+        for start in range(0, len(X), self.block_size):
+            block = slice(start, start + self.block_size)
+            counts += (
+                (indicator[:, y_codes[block]] @ X[block].astype(np.float32))
+                .round()
+                .astype(np.int64)
+            )
+        return counts
+
+    @staticmethod
+    def _sparse_counts(X, y_codes, n_classes):
+        """Single sparse product of the transposed features with the class indicator."""
+        indicator = sp.csr_matrix(
+            (np.ones(len(y_codes), dtype=np.int64), (np.arange(len(y_codes)), y_codes)),
+            shape=(len(y_codes), n_classes),
+        )
+        return np.asarray((sp.csr_matrix(X).T @ indicator).T.todense(), dtype=np.int64)
+
+    def _packed_counts(self, X, y_codes, n_classes):
+        """Popcount of the packed features masked with the packed rows of every class."""
+        if X.n_rows != len(y_codes):
+            raise ValueError(f"Got {X.n_rows} packed rows and {len(y_codes)} labels")
+        counts = np.zeros((n_classes, X.bits.shape[1]), dtype=np.int64)
+        block_bytes = max(self.block_size // 8, 1)
+        for c in range(n_classes):
+            class_bits = np.packbits(y_codes == c)
+            for start in range(0, len(class_bits), block_bytes):
+                block = slice(start, start + block_bytes)
+                set_bits = X.bits[block] & class_bits[block, None]
+                counts[c] += _POPCOUNT[set_bits].sum(axis=0, dtype=np.int64)
+        return counts
@@ -0,0 +1,235 @@
+from collections.abc import Mapping
+from typing import List, Optional
+
+import numpy as np
+
+from MushroomClassification.constants import INPUT_DOMAIN
+
+# number of values of every input field and the total number of possible inputs
+DOMAIN_SHAPE = tuple(len(values) for values in INPUT_DOMAIN.values())
+DOMAIN_SIZE = int(np.prod(DOMAIN_SHAPE))
+
+# position of every value inside its field's alphabet
+VALUE_INDEX = {
+    field: {value: i for i, value in enumerate(values)}
+    for field, values in INPUT_DOMAIN.items()
+}
+
+# mixed-radix weight of every field, last field varies fastest
+DOMAIN_STRIDES = tuple(
+    int(np.prod(DOMAIN_SHAPE[i + 1 :])) for i in range(len(DOMAIN_SHAPE))
+)
+
+# value position of the values outside the domain of their field
+UNKNOWN = 255
+
+
+def _build_byte_index() -> np.ndarray:
+    """Byte value -> value position lookup of every field, UNKNOWN marks values outside the domain."""
+    byte_index = np.full((len(INPUT_DOMAIN), 256), UNKNOWN, dtype=np.uint8)
+    for f, values in enumerate(INPUT_DOMAIN.values()):
+        for v, value in enumerate(values):
+            byte_index[f, ord(value)] = v
+    return byte_index
+
+
+_BYTE_INDEX = _build_byte_index()
+
+
+def feature_name(field: str, value: str) -> str:
+    """
+    Name of the one-hot column produced during training for the given input field and value,
+    e.g. ``gill_spacing`` / ``w`` -> ``gill-spacing_w``.
+    """
+    return f"{field.replace('_', '-')}_{value}"
+
+
+def record_to_index(record: dict) -> Optional[int]:
+    """
+    Mixed-radix index of a single input record inside the full input domain.
+
+    :param record: dict with one value per field of INPUT_DOMAIN
+    :return: index in ``[0, DOMAIN_SIZE)``, or None if a value is outside the domain
+    """
+    index = 0
+    for (field, values), stride in zip(VALUE_INDEX.items(), DOMAIN_STRIDES):
+        position = values.get(record.get(field))
+        if position is None:
+            return None
+        index += position * stride
+    return index
+
+
+def record_error(record) -> Optional[str]:
+    """
+    Why an input record cannot be coded at all, values outside the domain aside.
+
+    :param record: input record to check
+    :return: description of the first problem found, None if the record can be coded
+    """
+    if not isinstance(record, Mapping):
+        return f"Expected a mapping of field values, got {type(record).__name__}"
+    for field in INPUT_DOMAIN:
+        if field not in record:
+            return f"Missing field '{field}'"
+        if not isinstance(record[field], str):
+            return f"'{field}' must be a string, got {type(record[field]).__name__}"
+    return None
+
+
+def records_to_codes(records: List[dict], strict: bool = True) -> np.ndarray:
+    """
+    Value positions of many input records, computed field by field in vectorized passes.
+
+    :param records: dicts with one string value per field of INPUT_DOMAIN
+    :param strict: whether values outside the domain of their field raise, otherwise
+        they are coded as UNKNOWN, e.g. for ``Prediction.classify_many`` to score them
+        like ``Prediction.classify`` does
+    :return: uint8 array of shape (len(records), number of fields)
+    :raises ValueError: if ``strict`` and a value is outside the domain of its field
+    """
+    codes = np.empty((len(records), len(INPUT_DOMAIN)), dtype=np.uint8)
+    for f, field in enumerate(INPUT_DOMAIN):
+        values = [record[field] for record in records]
+        column = "".join(values)
+        # the values are single ASCII characters when the total length matches and none
+        # is empty, otherwise the other values are replaced by NUL, outside every domain
+        if (
+            len(column) != len(values)
+            or min(map(len, values), default=1) != 1
+            or not column.isascii()
+        ):
+            column = "".join(
+                value if len(value) == 1 and value.isascii() else "\0"
+                for value in values
+            )
+        codes[:, f] = _BYTE_INDEX[f, np.frombuffer(column.encode("ascii"), np.uint8)]
+
+    unknown = np.argwhere(codes == UNKNOWN)
+    if strict and len(unknown):
+        row, f = unknown[0]
+        field = list(INPUT_DOMAIN)[f]
+        raise ValueError(
+            f"Invalid value {records[row][field]!r} for '{field}' in record {row}"
+        )
+    return codes
+
+
+def frame_to_codes(df) -> np.ndarray:
+    """
+    Value positions of the input records held in a DataFrame, one column per field.
+
+    Columns may be named like the input fields (``gill_spacing``) or like the raw data
+    (``gill-spacing``), so the dataset itself can be scored. Values outside the domain of
+    a field that has an 'o' (others) value are read as 'o', as the API expects them to be
+    sent.
+
+    :param df: DataFrame with a column for every field of INPUT_DOMAIN, other columns are ignored
+    :return: uint8 array of shape (len(df), number of fields)
+    :raises ValueError: if a field is missing or a value is outside the domain of a field without 'o'
+    """
+    codes = np.empty((len(df), len(INPUT_DOMAIN)), dtype=np.uint8)
+    for f, (field, values) in enumerate(VALUE_INDEX.items()):
+        column = field if field in df.columns else field.replace("_", "-")
+        if column not in df.columns:
+            raise ValueError(f"Missing column for '{field}'")
+        positions = df[column].map(values)
+        unknown = positions.isna().to_numpy()
+        if unknown.any():
+            if "o" not in values:
+                row = int(np.argmax(unknown))
+                raise ValueError(
+                    f"Invalid value {df[column].iloc[row]!r} for '{field}' in row {row}"
+                )
+            positions = positions.fillna(values["o"])
+        codes[:, f] = positions.to_numpy()
+    return codes
+
+
+def codes_to_index(codes: np.ndarray) -> np.ndarray:
+    """Mixed-radix indices of inputs given as value positions, the vectorized ``record_to_index``."""
+    return codes.astype(np.intp) @ np.asarray(DOMAIN_STRIDES, dtype=np.intp)
+
+
+def domain_codes() -> np.ndarray:
+    """
+    Value positions of every possible input, ordered by their mixed-radix index.
+
+    :return: uint8 array of shape (DOMAIN_SIZE, number of fields)
+    """
+    return np.indices(DOMAIN_SHAPE, dtype=np.uint8).reshape(len(DOMAIN_SHAPE), -1).T
+
+
+class InputEncoder:
+    def __init__(self, feature_names: List[str], column_index: Optional[dict] = None):
+        """
+        One-hot encodes inputs into the feature columns expected by the model using
+        precomputed integer column indices.
+
+        Values without a matching column (e.g. 'o' for others) encode to all zeros.
+
+        :param feature_names: ordered feature columns of the model
+        :param column_index: ``{training column: {category: feature index}}`` as saved by the
+            data transformation stage, derived from ``feature_names`` when not given
+        """
+        self.feature_names = list(feature_names)
+        if column_index is None:
+            position = {name: i for i, name in enumerate(self.feature_names)}
+            column_index = {
+                field.replace("_", "-"): {
+                    value: position[feature_name(field, value)]
+                    for value in values
+                    if feature_name(field, value) in position
+                }
+                for field, values in INPUT_DOMAIN.items()
+            }
+
+        # {input field: {value: feature index}} for every value that has a column
+        self.value_columns = {
+            field: {
+                value: int(index)
+                for value, index in column_index.get(
+                    field.replace("_", "-"), {}
+                ).items()
+            }
+            for field in INPUT_DOMAIN
+        }
+
+        # (field position, value position, feature index) for the values of the domain
+        self.columns = [
+            (f, v, self.value_columns[field][value])
+            for f, (field, values) in enumerate(INPUT_DOMAIN.items())
+            for v, value in enumerate(values)
+            if value in self.value_columns[field]
+        ]
+
+    @classmethod
+    def from_artifact(cls, artifact: dict) -> "InputEncoder":
+        """Build the encoder from the artifact saved by the data transformation stage."""
+        return cls(artifact["selected_features"], artifact["column_index"])
+
+    def encode_record(self, record: dict) -> np.ndarray:
+        """
+        Encode a single input record into the model's feature matrix.
+
+        :param record: dict with one value per field of INPUT_DOMAIN
+        :return: uint8 array of shape (1, number of features)
+        """
+        X = np.zeros((1, len(self.feature_names)), dtype=np.uint8)
+        for field, value_columns in self.value_columns.items():
+            column = value_columns.get(record[field])
+            if column is not None:
+                X[0, column] = 1
+        return X
+
+    def encode_codes(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Encode value positions (see ``records_to_codes``) into the model's feature matrix.
+
+        :param codes: array of shape (n, number of fields) with value positions
+        :return: uint8 array of shape (n, number of features)
+        """
+        X = np.zeros((len(codes), len(self.feature_names)), dtype=np.uint8)
+        for f, v, column in self.columns:
+            X[:, column] = codes[:, f] == v
+        return X
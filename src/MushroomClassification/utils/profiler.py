@@ -0,0 +1,274 @@
+import cProfile
+import os
+import platform
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from MushroomClassification import logger
+from MushroomClassification.entity.config_entity import ProfilingConfig
+from MushroomClassification.utils.common import load_json, save_json
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+DUMP_MODES = ("none", "cprofile", "stacks")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size of the process, read from /proc on Linux, None elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _children_cpu() -> float:
+    """CPU seconds of the child processes that have finished, e.g. tuning workers."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _max_rss_mb() -> Optional[float]:
+    """Peak resident set size of the whole process so far (ru_maxrss is in KiB on Linux)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _collapsed_stack(frame) -> str:
+    """Stack of a frame root first, in the collapsed format of py-spy and flamegraph.pl."""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class StageProfiler:
+    def __init__(self, config: ProfilingConfig, run_id: Optional[str] = None):
+        """
+        Records the wall time, CPU time, peak RSS and rows processed of every stage of a
+        pipeline run, and of the sections profiled inside each stage, into a JSON report.
+
+        The report is saved under ``config.root_dir`` as ``run_<run_id>.json``, and as
+        ``latest.json``, every time a stage ends. Peak RSS is sampled by a background
+        thread every ``config.sample_interval_ms``. CPU time includes the child
+        processes that finished during the stage, e.g. the tuning workers.
+
+        With ``config.dump`` set to "cprofile" every stage runs under cProfile, and with
+        "stacks" the stack of the stage's thread is sampled along with the RSS. The
+        profile of the slowest stage of the run is kept, as a pstats ``.prof`` file or as
+        collapsed stacks (``.collapsed``) that flamegraph.pl, speedscope and py-spy read.
+
+        :param config: ProfilingConfig with the report directory and options
+        :param run_id: name of the run, a timestamp by default
+        """
+        if config.dump not in DUMP_MODES:
+            raise ValueError(
+                f"Unknown dump mode {config.dump!r}, expected one of {DUMP_MODES}"
+            )
+        self.config = config
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.report = {
+            "run_id": self.run_id,
+            "started_at": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "stages": [],
+        }
+        if self.report_path.exists():
+            # stages of the same run profiled by another process
+            self.report = load_json(self.report_path).to_dict()
+        self._stack = []
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampling = threading.Event()
+        self._stage_thread: Optional[int] = None
+        self._stacks: Counter = Counter()
+        self._slowest = 0.0
+
+    @property
+    def report_path(self) -> Path:
+        return Path(self.config.root_dir) / f"run_{self.run_id}.json"
+
+    def _sample(self):
+        rss = _rss_bytes()
+        with self._lock:
+            if rss is not None:
+                for record in self._stack:
+                    record["_peak"] = max(record["_peak"], rss)
+            if self.config.dump == "stacks" and self._stage_thread is not None:
+                frame = sys._current_frames().get(self._stage_thread)
+                if frame is not None:
+                    self._stacks[_collapsed_stack(frame)] += 1
+
+    def _run_sampler(self):
+        interval = self.config.sample_interval_ms / 1000
+        while not self._stop_sampling.wait(interval):
+            self._sample()
+
+    @contextmanager
+    def section(self, name: str, rows: Optional[int] = None):
+        """
+        Profile a part of the current stage, or a stage when none is running.
+
+        :param name: name of the section in the report
+        :param rows: number of rows processed, can also be set on the yielded record
+        :return: context manager yielding the record, whose "rows" can be set
+        """
+        rss = _rss_bytes()
+        record = {
+            "name": name,
+            "rows": rows,
+            "_wall": time.perf_counter(),
+            "_cpu": time.process_time(),
+            "_children_cpu": _children_cpu(),
+            "_rss": rss,
+            "_peak": rss or 0,
+        }
+        with self._lock:
+            parent = self._stack[-1] if self._stack else None
+            self._stack.append(record)
+        try:
+            yield record
+        except BaseException:
+            record["failed"] = True
+            raise
+        finally:
+            self._sample()
+            with self._lock:
+                self._stack.remove(record)
+            self._close(record)
+            if parent is not None:
+                parent.setdefault("sections", []).append(record)
+
+    @staticmethod
+    def _close(record):
+        wall = time.perf_counter() - record.pop("_wall")
+        record["wall_seconds"] = wall
+        record["cpu_seconds"] = time.process_time() - record.pop("_cpu")
+        record["children_cpu_seconds"] = _children_cpu() - record.pop("_children_cpu")
+        rss, peak = record.pop("_rss"), record.pop("_peak")
+        if rss is not None:
+            record["start_rss_mb"] = rss / 2**20
+            record["peak_rss_mb"] = peak / 2**20
+        if record["rows"]:
+            record["rows_per_second"] = record["rows"] / wall if wall else None
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Profile a pipeline stage and save the report when it ends.
+
+        :param name: name of the stage
+        :return: context manager yielding the stage record, e.g. to set "rows" or "cached"
+        """
+        if not self.config.enabled:
+            yield {}
+            return
+
+        global _active
+        profile = cProfile.Profile() if self.config.dump == "cprofile" else None
+        self._stacks.clear()
+        self._stage_thread = threading.get_ident()
+        self._stop_sampling.clear()
+        self._sampler = threading.Thread(target=self._run_sampler, daemon=True)
+        self._sampler.start()
+        _active = self
+        try:
+            with self.section(name) as record:
+                if profile is not None:
+                    profile.enable()
+                try:
+                    yield record
+                finally:
+                    if profile is not None:
+                        profile.disable()
+        finally:
+            _active = None
+            self._stop_sampling.set()
+            self._sampler.join()
+            self._stage_thread = None
+            self.report["stages"].append(record)
+            self._dump_if_slowest(record, profile)
+            self.save()
+
+    def _dump_if_slowest(self, record, profile):
+        """Keep the profile of the stage if it is the slowest of the run so far."""
+        if self.config.dump == "none" or record["wall_seconds"] <= self._slowest:
+            return
+        self._slowest = record["wall_seconds"]
+        root = Path(self.config.root_dir)
+        root.mkdir(parents=True, exist_ok=True)
+        if profile is not None:
+            path = root / f"run_{self.run_id}_slowest.prof"
+            profile.dump_stats(str(path))
+        else:
+            path = root / f"run_{self.run_id}_slowest.collapsed"
+            with open(path, "w") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        self.report["slowest_stage"] = {
+            "name": record["name"],
+            "wall_seconds": record["wall_seconds"],
+            "profile": str(path),
+        }
+        logger.info(f"Saved the profile of the slowest stage to {path}")
+
+    def save(self):
+        """Save the report of the run so far."""
+        self.report["max_rss_mb"] = _max_rss_mb()
+        save_json(path=self.report_path, data=self.report)
+        save_json(path=Path(self.config.root_dir) / "latest.json", data=self.report)
+
+
+# profiler of the running stage, used by profile_section
+_active: Optional[StageProfiler] = None
+
+# profiler of the pipeline run of this process, shared by its stages
+_run_profiler: Optional[StageProfiler] = None
+
+
+def get_profiler(config: ProfilingConfig) -> StageProfiler:
+    """
+    Return the profiler of the pipeline run of this process, creating it on first use.
+
+    The run is named by the ``PIPELINE_RUN_ID`` environment variable when set, so the
+    stages of a run spread over several processes share one report.
+    """
+    global _run_profiler
+    if _run_profiler is None or _run_profiler.config != config:
+        _run_profiler = StageProfiler(config, os.environ.get("PIPELINE_RUN_ID"))
+    return _run_profiler
+
+
+@contextmanager
+def profile_section(name: str, rows: Optional[int] = None):
+    """
+    Profile a part of the running stage, e.g. a strategy call of a component. Outside a
+    profiled stage this does nothing.
+
+    :param name: name of the section in the report
+    :param rows: number of rows processed, can also be set on the yielded record
+    :return: context manager yielding the record, whose "rows" can be set
+    """
+    profiler = _active
+    if profiler is None:
+        yield {}
+        return
+    with profiler.section(name, rows) as record:
+        yield record
@@ -0,0 +1,184 @@
+import ast
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+from dataclasses import fields
+from pathlib import Path
+from typing import Iterable, Optional
+
+from MushroomClassification import logger
+from MushroomClassification.entity.config_entity import StageCacheConfig
+from MushroomClassification.utils.common import (get_file_hash, load_json,
+                                                 save_json)
+
+
+def _stamp(path) -> Optional[list]:
+    """Cheap (mtime, size) signature of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+# root package whose modules are followed when fingerprinting code
+PACKAGE = "MushroomClassification"
+
+
+def _imported_modules(path: str) -> Iterable[str]:
+    """Names of the modules, and of the names that may be submodules, imported anywhere in a source file."""
+    tree = ast.parse(Path(path).read_text())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            yield from (alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            yield node.module
+            yield from (f"{node.module}.{alias.name}" for alias in node.names)
+
+
+def _package_source(name: str) -> Optional[str]:
+    """Source file of a module of the package, None for other modules and plain names."""
+    parts = name.split(".")
+    # the package is also imported as src.MushroomClassification by the scripts
+    if parts[0] == "src":
+        parts = parts[1:]
+    if parts[0] != PACKAGE:
+        return None
+    try:
+        spec = importlib.util.find_spec(".".join(parts))
+    except (ImportError, ValueError):
+        return None
+    return spec.origin if spec is not None else None
+
+
+def code_files(objects: Iterable) -> list:
+    """
+    Source files of the given modules, classes or functions and of every module of the
+    package they import, followed transitively, so that editing a helper or a constant
+    a stage uses changes its fingerprint.
+
+    :param objects: modules, classes or functions
+    :return: sorted paths of the source files
+    """
+    pending = [inspect.getsourcefile(obj) for obj in objects]
+    files = set()
+    while pending:
+        path = pending.pop()
+        if path in files:
+            continue
+        files.add(path)
+        for name in _imported_modules(path):
+            source = _package_source(name)
+            if source is not None and source not in files:
+                pending.append(source)
+    return sorted(files)
+
+
+class StageCache:
+    def __init__(
+        self,
+        stage: str,
+        cache_config: StageCacheConfig,
+        stage_config,
+        inputs: Iterable[Path],
+        outputs: Iterable[Path],
+        code: Iterable = (),
+    ):
+        """
+        Lets a pipeline stage skip itself when nothing it depends on changed.
+
+        The fingerprint of a stage is the sha256 of its config dataclass (paths and
+        params), the content hash of every input file and the content hash of the source
+        files of its code, including the helpers of the package it imports. After a successful run the fingerprint is recorded with the
+        signature of every output; on the next run the stage is up to date, and its
+        artifacts reused, when the fingerprint matches and the outputs are untouched.
+
+        Input hashes are remembered with the (mtime, size) of the file, so unchanged
+        inputs are not hashed again and a no-op rerun only stats files.
+
+        :param stage: name of the stage, also naming its record
+        :param cache_config: StageCacheConfig with the record directory
+        :param stage_config: config dataclass of the stage
+        :param inputs: files the stage reads
+        :param outputs: files the stage writes
+        :param code: modules, classes or functions whose source files, and those of the
+            package modules they import, are part of the fingerprint
+        """
+        self.stage = stage
+        self.enabled = cache_config.enabled
+        self.stage_config = stage_config
+        self.inputs = [str(path) for path in inputs]
+        self.outputs = [str(path) for path in outputs]
+        self.code = code_files(code)
+        self.record_path = Path(cache_config.root_dir) / (
+            stage.lower().replace(" ", "_") + ".json"
+        )
+        self._record = self._load_record()
+        self._fingerprint = None
+
+    def _load_record(self) -> dict:
+        try:
+            return load_json(self.record_path).to_dict()
+        except Exception:
+            return {}
+
+    def _hash_file(self, path: str) -> str:
+        """Content hash of a file, reusing the recorded one when its signature is unchanged."""
+        stamp = _stamp(path)
+        if stamp is None:
+            raise FileNotFoundError(f"Input of {self.stage} not found: {path}")
+        known = self._record.get("files", {}).get(path)
+        if known is not None and known["stamp"] == stamp:
+            return known["hash"]
+        return get_file_hash(Path(path))
+
+    def fingerprint(self) -> str:
+        """sha256 of the config, the inputs and the code of the stage."""
+        if self._fingerprint is None:
+            config = {
+                field.name: getattr(self.stage_config, field.name)
+                for field in fields(self.stage_config)
+            }
+            content = {
+                "config": config,
+                "inputs": {path: self._hash_file(path) for path in self.inputs},
+                "code": {path: self._hash_file(path) for path in self.code},
+            }
+            self._fingerprint = hashlib.sha256(
+                json.dumps(content, sort_keys=True, default=str).encode()
+            ).hexdigest()
+        return self._fingerprint
+
+    def is_fresh(self) -> bool:
+        """True when the recorded run used the same fingerprint and its outputs are untouched."""
+        if not self.enabled or not self._record:
+            return False
+        if self._record.get("fingerprint") != self.fingerprint():
+            return False
+        outputs = self._record.get("outputs", {})
+        return all(
+            _stamp(path) is not None and _stamp(path) == outputs.get(path)
+            for path in self.outputs
+        )
+
+    def save(self):
+        """Record a successful run of the stage."""
+        if not self.enabled:
+            return
+        files = {
+            path: {"stamp": _stamp(path), "hash": self._hash_file(path)}
+            for path in self.inputs + self.code
+        }
+        self.record_path.parent.mkdir(parents=True, exist_ok=True)
+        save_json(
+            path=self.record_path,
+            data={
+                "stage": self.stage,
+                "fingerprint": self.fingerprint(),
+                "files": files,
+                "outputs": {path: _stamp(path) for path in self.outputs},
+            },
+        )
+        logger.info(f"{self.stage} recorded in the stage cache")